@@ -1,8 +1,9 @@
 from __future__ import annotations
+import sys
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Dict
 from .models_v2 import SessionStatusV2, PlanRowV2, AnalyzeResponseV2, Policy
-from .engine_v2 import plan, analyze, load_policy, save_policy, session_status
+from .engine_v2 import plan, plan_fast, analyze, load_policy, save_policy, session_status
 
 router = APIRouter()
 
@@ -12,7 +13,12 @@ def get_session() -> Dict:
 
 @router.get("/plan", response_model=List[PlanRowV2])
 def get_plan(top: int = Query(10, ge=1, le=100)) -> List[Dict]:
-    rows, _meta = plan(top_n=top)
+    try:
+        res = plan_fast(top_n=top)  # ticker-maintained leaderboard
+    except Exception as e:
+        print(f"[plan_fast] leaderboard read failed, falling back to plan(): {e!r}", file=sys.stderr)
+        res = None
+    rows, _meta = res or plan(top_n=top)
     return rows
 
 @router.get("/analyze", response_model=AnalyzeResponseV2)
@@ -348,13 +348,16 @@ def debug_refresh_cache(exchange: str = None):
         )
     
     try:
-        # Clear the cache for the requested exchange
+        # Clear the cache for the requested exchange (and the shared per-day master)
+        from . import instruments as inst_master
         if exchange and exchange != "ALL":
             log.info(f"[DEBUG] Clearing cache for {exchange}")
             _INSTRUMENTS_CACHE.pop(exchange, None)
+            inst_master.invalidate(exchange)
         else:
             log.info(f"[DEBUG] Clearing entire instruments cache")
             _INSTRUMENTS_CACHE.clear()
+            inst_master.invalidate()
         
         # Warm the cache
         success = warm_instruments_cache(ks)
@@ -1,7 +1,15 @@
 from __future__ import annotations
-from typing import Any, Dict, List
-import os, json, math, time
+from typing import Any, Dict, List, Optional
+import os, math, time
 from .rl import redis_client
+from . import snapstore
+
+# Snapshot fields the ensemble scorer reads (hash-mode snapshots HMGET only these).
+PLAN_FIELDS = (
+    "ema9", "ema21", "rsi14", "minute_vol_multiple", "vwap_delta_pct", "last_close",
+    "bb_middle", "bb_lower", "bb_upper", "donchian_lo", "donchian_hi", "atr14",
+    "orb_high", "orb_low",
+)
 
 
 # ---------- helpers ----------
@@ -47,14 +55,25 @@ def _side_align(value_signed: float, side: str, scale: float = 1.0) -> float:
 # ---------- data access ----------
 def minute_snapshot(symbol: str) -> Dict[str, Any]:
     r = redis_client(os.getenv("REDIS_URL"), decode_responses=True)
-    raw = r.get(f"snap:{symbol}")
-    if not raw:
+    snap = snapstore.read_snap(r, symbol)
+    if not snap:
         raise RuntimeError(f"live snapshot not available for {symbol}")
-    snap = json.loads(raw)
     snap["fresh_ms"] = int(time.time()*1000) - int(snap.get("ts_ms", int(time.time()*1000)))
     return snap
 
 
+def minute_snapshots(symbols: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Batched minute_snapshot: symbol -> snapshot, or None when not available."""
+    r = redis_client(os.getenv("REDIS_URL"), decode_responses=True)
+    now = int(time.time()*1000)
+    out: Dict[str, Optional[Dict[str, Any]]] = {}
+    for sym, snap in zip(symbols, snapstore.read_snaps(r, symbols)):
+        if snap:
+            snap["fresh_ms"] = now - int(snap.get("ts_ms", now))
+        out[sym] = snap
+    return out
+
+
 # ---------- main planner ----------
 def plan(universe: List[str], top_n: int = 30) -> List[Dict[str, Any]]:
     """
@@ -79,11 +98,10 @@ def plan(universe: List[str], top_n: int = 30) -> List[Dict[str, Any]]:
     r = redis_client(os.getenv("REDIS_URL"), decode_responses=True)
     rows: List[Dict[str, Any]] = []
 
-    for sym in universe[:2000]:
-        raw = r.get(f"snap:{sym}")
-        if not raw:
+    syms = list(universe[:2000])
+    for sym, s in zip(syms, snapstore.read_snaps(r, syms, PLAN_FIELDS)):
+        if not s:
             continue
-        s = json.loads(raw)
 
         # --- base indicators (safe-cast) ---
         ema9   = _safe(s.get("ema9"))
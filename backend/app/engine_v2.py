@@ -1,15 +1,34 @@
 from __future__ import annotations
-import json, os, math, time, statistics
-from typing import Dict, List, Tuple, Optional
+import json, os, sys, math, time, statistics, threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple, Optional
 from zoneinfo import ZoneInfo
+import numpy as np
 import redis
 from kiteconnect.exceptions import TokenException
 from .kite import get_kite
+from . import snapstore
+from .rl import redis_client
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
 IST = ZoneInfo("Asia/Kolkata")
-def r() -> redis.Redis: return redis.from_url(REDIS_URL, decode_responses=True)
+def r() -> redis.Redis: return redis_client(REDIS_URL)  # process-wide pool
 def now_ms() -> int: return int(time.time() * 1000)
+PLAN_TOP_TTL_S = int(os.environ.get("PLAN_TOP_TTL_S", "600"))  # plan:top drives the ticker's TIERED upgrades
+LB_TTL_S = int(os.environ.get("LB_TTL_S", "86400"))
+LB_MAX_AGE_S = int(os.environ.get("LB_MAX_AGE_S", "180"))  # older leaderboards fall back to plan()
+SCORE_PARITY_SAMPLE = int(os.environ.get("SCORE_PARITY_SAMPLE", "0"))  # rows per plan() re-scored by _score_row
+
+# Snapshot fields read by _factors/plan/analyze (hash-mode snapshots HMGET only these).
+SCORER_FIELDS = (
+    "price", "last_price", "last_close", "atr", "atr14", "ema9", "ema21", "vwap",
+    "donch_lo", "donch_hi", "donchian_lo", "donchian_hi", "donchian_lower", "donchian_upper",
+    "vol_mult", "minute_vol_multiple", "spread_pct", "ts_ms",
+)
+# Higher-timeframe rollups the ticker stores as tf{N} snapshot fields (see ROLLUP_TFS there).
+ROLLUP_TFS = tuple(int(x) for x in os.environ.get("ROLLUP_TFS", "5,15,60").split(",") if x.strip())
+ANALYZE_FIELDS = SCORER_FIELDS + tuple(f"tf{tf}" for tf in ROLLUP_TFS)
 
 def market_open_ist() -> bool:
     """Check if market is currently open in IST"""
@@ -28,43 +47,196 @@ def _load_policy_file() -> Dict:
     with open(os.path.join(here, "policy.json"), "r", encoding="utf-8") as f:
         return json.load(f)
 
-def load_policy() -> Tuple[Dict, int]:
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    Immutable view of one policy rev with the scorer's lookups resolved once.
+    `body` is the parsed policy document frozen by _freeze (read-only mappings and
+    tuples); load_policy hands out a plain-dict copy.
+    """
+    rev: int
+    body: Mapping
+    weights: Tuple[float, float, float, float, float]  # trend, pullback, vwap, breakout, volume
+    weight_sum: float
+    cap_calm: float
+    cap_normal: float
+    cap_hot: float
+    max_spread_pct: Optional[float]
+    spread_mult: float          # confidence multiplier once spread_pct > max_spread_pct
+    staleness_s: int
+    entry_start: str
+    entry_end: str
+    universe_mode: str
+    exclude_patterns: Tuple[str, ...]
+    entry_chase_atr: float
+    tp1_atr: float
+    tp2_atr: float
+    stop_vwap_offset_atr: float
+
+    def regime_cap(self, regime: str) -> float:
+        return {"Calm": self.cap_calm, "Hot": self.cap_hot}.get(regime, self.cap_normal)
+
+def _freeze(v):
+    if isinstance(v, Mapping):
+        return MappingProxyType({k: _freeze(x) for k, x in v.items()})
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+def _thaw(v):
+    if isinstance(v, Mapping):
+        return {k: _thaw(x) for k, x in v.items()}
+    if isinstance(v, tuple):
+        return [_thaw(x) for x in v]
+    return v
+
+def compile_policy(body: Dict, rev: int) -> CompiledPolicy:
+    w = body.get("weights", {})
+    weights = (w.get("trend", 1), w.get("pullback", 0.6), w.get("vwap", 0.8), w.get("breakout", 0.7), w.get("volume", 0.6))
+    caps = body.get("regime_caps", {"Calm": 0.9, "Normal": 0.8, "Hot": 0.6})
+    max_sp = body.get("thresholds", {}).get("max_spread_pct")
+    pen = w.get("spread_penalty")
+    uni = body.get("universe", {})
+    b = body.get("bracket", {})
+    return CompiledPolicy(
+        rev=int(rev), body=_freeze(body), weights=weights,
+        weight_sum=weights[0] + weights[1] + weights[2] + weights[3] + weights[4],
+        cap_calm=float(caps.get("Calm", 0.8)), cap_normal=float(caps.get("Normal", 0.8)), cap_hot=float(caps.get("Hot", 0.8)),
+        max_spread_pct=None if max_sp is None or pen is None else float(max_sp),
+        spread_mult=1.0 if pen is None else max(0.0, 1.0 + float(pen)),
+        staleness_s=int(body.get("staleness_s", 10)),
+        entry_start=body.get("entry_window", {}).get("start", "11:00"),
+        entry_end=body.get("entry_window", {}).get("end", "15:10"),
+        universe_mode=(uni.get("mode") or "strict").lower(),
+        exclude_patterns=tuple(uni.get("exclude_patterns", [])),
+        entry_chase_atr=float(b.get("entry_chase_atr", 0.15)), tp1_atr=float(b.get("tp1_atr", 0.75)),
+        tp2_atr=float(b.get("tp2_atr", 1.5)), stop_vwap_offset_atr=float(b.get("stop_vwap_offset_atr", 0.5)),
+    )
+
+# In-process cache of the compiled policy. save_policy publishes the new rev on
+# POLICY_CHANNEL; a listener thread drops the cache when any process saves. The
+# cached rev is also re-checked against policy:rev every POLICY_RECHECK_S (and
+# on every call while the listener is down), so a missed message costs at most
+# that long.
+POLICY_CHANNEL = "policy:changed"
+POLICY_RECHECK_S = float(os.environ.get("POLICY_RECHECK_S", "5"))
+_policy: Optional[CompiledPolicy] = None
+_policy_checked = 0.0
+_policy_lock = threading.Lock()
+_policy_listener: Optional[threading.Thread] = None
+_policy_listening = threading.Event()
+
+def _listen_policy():
+    global _policy
+    while True:
+        ps = None
+        try:
+            ps = r().pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(POLICY_CHANNEL)
+            with _policy_lock:
+                _policy = None  # anything saved while we were not subscribed
+            _policy_listening.set()
+            while True:
+                msg = ps.get_message(timeout=1.0)
+                if msg and msg.get("type") == "message":
+                    with _policy_lock:
+                        cur = _policy
+                        if cur is None or str(cur.rev) != str(msg.get("data")):
+                            _policy = None
+        except Exception:
+            _policy_listening.clear()
+            time.sleep(2.0)
+        finally:
+            if ps is not None:
+                try:
+                    ps.close()  # return the pubsub connection before resubscribing
+                except Exception:
+                    pass
+
+def _ensure_policy_listener():
+    global _policy_listener
+    if _policy_listener is None or not _policy_listener.is_alive():
+        with _policy_lock:
+            if _policy_listener is None or not _policy_listener.is_alive():
+                _policy_listener = threading.Thread(target=_listen_policy, name="policy-listener", daemon=True)
+                _policy_listener.start()
+
+def _fetch_policy() -> CompiledPolicy:
     rd = r()
-    raw = rd.get("policy:current")
-    rev = int(rd.get("policy:rev") or 0)
+    pipe = rd.pipeline()  # MULTI: body and rev from the same save
+    pipe.get("policy:current")
+    pipe.get("policy:rev")
+    raw, rev = pipe.execute()
     if raw:
-        return json.loads(raw), rev
+        return compile_policy(json.loads(raw), int(rev or 0))
     pf = _load_policy_file()     # first run: hydrate from file
     rd.set("policy:current", json.dumps(pf))
     rd.set("policy:rev", 1)
-    return pf, 1
+    return compile_policy(pf, 1)
+
+def get_policy() -> CompiledPolicy:
+    """Compiled current policy, served from the in-process cache while policy:rev is unchanged."""
+    global _policy, _policy_checked
+    _ensure_policy_listener()
+    cp, now = _policy, time.monotonic()
+    if cp is not None and _policy_listening.is_set() and now - _policy_checked < POLICY_RECHECK_S:
+        return cp
+    if cp is not None and int(r().get("policy:rev") or 0) == cp.rev:
+        _policy_checked = now
+        return cp
+    seen, cp = cp, _fetch_policy()
+    with _policy_lock:
+        # A save or invalidation that landed during the fetch wins over what we read.
+        if _policy is seen:
+            _policy, _policy_checked = cp, now
+    return cp
+
+def load_policy() -> Tuple[Dict, int]:
+    cp = get_policy()
+    return _thaw(cp.body), cp.rev
 
 def save_policy(new_body: Dict) -> int:
+    global _policy, _policy_checked
     rd = r()
-    rd.set("policy:current", json.dumps(new_body))
-    return int(rd.incr("policy:rev"))
+    pipe = rd.pipeline()
+    raw = json.dumps(new_body)
+    pipe.set("policy:current", raw)
+    pipe.incr("policy:rev")
+    _, rev = pipe.execute()
+    cp = compile_policy(json.loads(raw), int(rev))
+    with _policy_lock:
+        _policy, _policy_checked = cp, time.monotonic()
+    rd.publish(POLICY_CHANNEL, int(rev))
+    return int(rev)
 
 # --- helpers ---
-def window_status(pol: Dict) -> str:
+def window_status(cp: CompiledPolicy) -> str:
     from datetime import datetime
     now = datetime.now(tz=IST)
     hhmm = f"{now.hour:02d}:{now.minute:02d}"
-    start = pol.get("entry_window", {}).get("start", "11:00")
-    end   = pol.get("entry_window", {}).get("end", "15:10")
-    if hhmm < start: return "early"
-    if hhmm > end:   return "closed"
+    if hhmm < cp.entry_start: return "early"
+    if hhmm > cp.entry_end:   return "closed"
     return "ok"
 
 def list_active_symbols() -> List[str]:
     return sorted(list(r().smembers("symbols:active") or []))
 
-def read_snap(sym: str) -> Optional[Dict]:
-    raw = r().get(f"snap:{sym}")
-    if not raw: return None
-    j = json.loads(raw)
+def read_snap(sym: str, fields=SCORER_FIELDS) -> Optional[Dict]:
+    j = snapstore.read_snap(r(), sym, fields)
+    if not j: return None
     j["_age_s"] = max(0.0, (now_ms() - float(j.get("ts_ms", now_ms()))) / 1000.0)
     return j
 
+def read_snaps(syms: List[str], fields=SCORER_FIELDS) -> List[Tuple[str, Dict]]:
+    """(symbol, snapshot) for the syms that have one, in order; batched reads."""
+    now = now_ms()
+    out = []
+    for sym, j in zip(syms, snapstore.read_snaps(r(), syms, fields)):
+        if not j: continue
+        j["_age_s"] = max(0.0, (now - float(j.get("ts_ms", now))) / 1000.0)
+        out.append((sym, j))
+    return out
+
 # --- simple scoring (bounded factors) ---
 def _side(ema9, ema21) -> str: return "long" if (ema9 or 0) >= (ema21 or 0) else "short"
 def _regime(atr, price) -> str:
@@ -80,7 +252,7 @@ def _trigger(side, ema9, don_l, don_u):
     c = [v for v in [don_l, ema9] if isinstance(v, (int,float))]
     return min(c) if c else None
 
-def _factors(s: Dict, pol: Dict) -> Dict[str, float]:
+def _factors(s: Dict) -> Dict[str, float]:
     price = s.get("price") or s.get("last_price") or s.get("last_close") or 0
     atr = s.get("atr") or s.get("atr14") or 1.0
     ema9 = s.get("ema9") or 0
@@ -108,17 +280,25 @@ def _factors(s: Dict, pol: Dict) -> Dict[str, float]:
     volume = squash(volx, 0.5, 2.0)
     return {"trend":float(trend),"pullback":float(pull),"vwap":float(vwap_align),"breakout":float(breakout),"volume":float(volume)}
 
-def _score_conf(factors: Dict[str,float], pol: Dict, regime: str, fresh_ok: bool, liq_ok: bool) -> Tuple[float,float]:
-    w = pol.get("weights", {})
-    num = (w.get("trend",1)*factors["trend"] + w.get("pullback",0.6)*factors["pullback"] +
-           w.get("vwap",0.8)*factors["vwap"] + w.get("breakout",0.7)*factors["breakout"] +
-           w.get("volume",0.6)*factors["volume"])
-    den = (w.get("trend",1)+w.get("pullback",0.6)+w.get("vwap",0.8)+w.get("breakout",0.7)+w.get("volume",0.6))
+def _spread_factor(spread_pct: Optional[float], cp: CompiledPolicy) -> float:
+    """
+    Confidence multiplier for a wide book: (1 + weights.spread_penalty) once the minute's
+    average spread exceeds thresholds.max_spread_pct (percent). 1.0 without depth data.
+    """
+    if spread_pct is None or cp.max_spread_pct is None:
+        return 1.0
+    return cp.spread_mult if float(spread_pct) > cp.max_spread_pct else 1.0
+
+def _score_conf(factors: Dict[str,float], cp: CompiledPolicy, regime: str, fresh_ok: bool, liq_ok: bool,
+                spread_pct: Optional[float] = None) -> Tuple[float,float]:
+    wt, wp, wv, wb, wvol = cp.weights
+    num = (wt*factors["trend"] + wp*factors["pullback"] + wv*factors["vwap"] +
+           wb*factors["breakout"] + wvol*factors["volume"])
+    den = cp.weight_sum
     score = 100.0 * num / max(1e-6, den)
     
     # Better confidence calculation: base confidence from factors
-    caps = pol.get("regime_caps", {"Calm":0.9,"Normal":0.8,"Hot":0.6})
-    regime_cap = float(caps.get(regime, 0.8))
+    regime_cap = cp.regime_cap(regime)
     
     # Base confidence from normalized factors (0..1 range)
     base_conf = num / max(1e-6, den)  # This gives 0..1 range since factors are 0..1
@@ -131,13 +311,14 @@ def _score_conf(factors: Dict[str,float], pol: Dict, regime: str, fresh_ok: bool
         conf *= 0.3  # Significant penalty for stale data
     if not liq_ok:
         conf *= 0.7  # Moderate penalty for liquidity issues (not a hard cap)
+    conf *= _spread_factor(spread_pct, cp)  # wide top-of-book (FULL-mode depth)
     
     # Ensure confidence is in valid range
     conf = max(0.0, min(1.0, float(conf)))
     
     return float(score), float(conf)
 
-def _universe_soft_reason(sym: str, pol: Dict) -> Optional[str]:
+def _universe_soft_reason(sym: str, cp: CompiledPolicy) -> Optional[str]:
     """
     Check if a symbol is suitable for intraday trading in Top Algos.
     Uses strict filtering to ensure only high-liquidity, intraday-suitable stocks.
@@ -147,13 +328,12 @@ def _universe_soft_reason(sym: str, pol: Dict) -> Optional[str]:
     """
     from .universe import get_non_intraday_reason
     
-    mode = (pol.get("universe", {}).get("mode") or "strict").lower()
+    mode = cp.universe_mode
     if mode == "off": 
         return None
     
     # Check custom exclude patterns from policy
-    pats = pol.get("universe", {}).get("exclude_patterns", [])
-    if any(pat in sym for pat in pats):
+    if any(pat in sym for pat in cp.exclude_patterns):
         return "non_intraday" if mode in ("strict", "soft") else None
     
     # Use comprehensive intraday check from universe module
@@ -165,63 +345,252 @@ def _universe_soft_reason(sym: str, pol: Dict) -> Optional[str]:
     
     return None
 
-def plan(top_n: int = 10) -> Tuple[List[Dict], Dict]:
-    pol, rev = load_policy()
-    staleness = int(pol.get("staleness_s", 10))
-    wstatus = window_status(pol)
-    rows, ages = [], []
+def _score_row(sym: str, s: Dict, cp: CompiledPolicy) -> Dict:
+    """Time-independent part of a plan row; _finish_row applies age, staleness and the entry window."""
+    price, atr, ema9, ema21 = s.get("price") or s.get("last_price"), s.get("atr"), s.get("ema9"), s.get("ema21")
+    don_l, don_u = s.get("donch_lo") or s.get("donchian_lower"), s.get("donch_hi") or s.get("donchian_upper")
+    side = _side(ema9, ema21)
+    regime = _regime(atr, price)
+    factors = _factors(s)
+    liq_reason = _universe_soft_reason(sym, cp)
+    liq_ok = liq_reason is None
+    score, conf = _score_conf(factors, cp, regime, True, liq_ok, s.get("spread_pct"))
+    trig = _trigger(side, ema9, don_l, don_u)
+    d_bps = None if trig is None or not price else round(abs(trig-price)/price*10000.0, 1)
+    return {
+        "symbol": sym, "side": side, "score": round(score,1), "_conf": conf,
+        "regime": regime, "delta_trigger_bps": d_bps, "_liq_reason": liq_reason,
+        "checks": {"VWAPΔ": factors["vwap"] >= 0.5, "VolX": (s.get("vol_mult") or 1.0) >= 1.0, "Liquidity": liq_ok}
+    }
 
-    for sym in list_active_symbols():
-        s = read_snap(sym)
-        if not s: continue
-        ages.append(s["_age_s"])
-        price, atr, ema9, ema21 = s.get("price") or s.get("last_price"), s.get("atr"), s.get("ema9"), s.get("ema21")
-        don_l, don_u = s.get("donch_lo") or s.get("donchian_lower"), s.get("donch_hi") or s.get("donchian_upper")
-        side = _side(ema9, ema21)
-        regime = _regime(atr, price)
-        factors = _factors(s, pol)
-        fresh_ok = s["_age_s"] <= staleness
-        liq_reason = _universe_soft_reason(sym, pol)
-        liq_ok = liq_reason is None
-        score, conf = _score_conf(factors, pol, regime, fresh_ok, liq_ok)
-        trig = _trigger(side, ema9, don_l, don_u)
-        d_bps = None if trig is None or not price else round(abs(trig-price)/price*10000.0, 1)
+# --- batch scoring: _score_row over a whole universe in one NumPy pass ---
+_BATCH_FIELDS = (
+    "price", "last_price", "last_close", "atr", "atr14", "ema9", "ema21", "vwap",
+    "donch_lo", "donch_hi", "donchian_lo", "donchian_hi", "donchian_lower", "donchian_upper",
+    "vol_mult", "minute_vol_multiple", "spread_pct",
+)
+
+def _num(v) -> float:
+    try:
+        return float(v) if v is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+def _or(*cols):
+    """Vectorised `a or b or ...`: first truthy (non-missing, non-zero) column wins, else the last."""
+    out = cols[-1]
+    for c in reversed(cols[:-1]):
+        out = np.where(np.isnan(c) | (c == 0), out, c)
+    return out
+
+def _squash(x, lo, hi):
+    return (np.clip(x, lo, hi) - lo) / (hi - lo)
+
+def _score_rows(syms: List[str], snaps: List[Dict], cp: CompiledPolicy) -> List[Dict]:
+    """
+    _score_row for many symbols at once: snapshot fields are loaded into arrays and
+    factors, regime, score, confidence and trigger distance are computed column-wise.
+    The `or` fallbacks mirror _factors/_score_row, so rows match the per-symbol path.
+    """
+    n = len(syms)
+    if not n:
+        return []
+    c = {f: np.fromiter((_num(s.get(f)) for s in snaps), dtype=float, count=n) for f in _BATCH_FIELDS}
+    zero, one = np.zeros(n), np.ones(n)
+
+    # _factors
+    price = _or(c["price"], c["last_price"], c["last_close"], zero)
+    atr_den = np.maximum(1e-6, _or(c["atr"], c["atr14"], one))
+    ema9, ema21 = _or(c["ema9"], zero), _or(c["ema21"], zero)
+    vwap = _or(c["vwap"], price)
+    trend = _squash((ema9 - ema21) / atr_den, -1.0, 1.0)
+    pull = np.exp(-(np.abs(price - ema9) / atr_den) ** 2)
+    vwap_f = 1.0 - _squash(np.abs(price - vwap) / atr_den, 0.0, 2.0)
+    don_l = _or(c["donch_lo"], c["donchian_lower"], c["donchian_lo"], price)
+    don_u = _or(c["donch_hi"], c["donchian_upper"], c["donchian_hi"], price)
+    long_ = ema9 >= ema21
+    edge = np.where(long_, np.abs(don_u - price), np.abs(price - don_l))
+    breakout = np.maximum(0.0, 1.0 - _squash(edge / atr_den, 0.0, 2.0))
+    volume = _squash(_or(c["vol_mult"], c["minute_vol_multiple"], one), 0.5, 2.0)
 
-        readiness, block_reason = "Wait", None
-        if not fresh_ok: readiness, block_reason = "Stale", "stale"
-        elif wstatus != "ok": readiness, block_reason = "Blocked", f"window:{wstatus}"
-        elif not liq_ok: readiness, block_reason = "Blocked", liq_reason
-        elif d_bps is not None: readiness = "Ready" if d_bps <= 20 else ("Near" if d_bps <= 60 else "Wait")
+    # _score_conf (fresh_ok=True; _finish_row applies the stale penalty)
+    wt, wp, wv, wb, wvol = cp.weights
+    num = wt * trend + wp * pull + wv * vwap_f + wb * breakout + wvol * volume
+    den = max(1e-6, cp.weight_sum)
+    score = 100.0 * num / den
 
+    # _regime uses the raw price/atr (no last_close/atr14 fallback)
+    rprice = _or(c["price"], c["last_price"])
+    rv = _or(c["atr"], zero) / np.maximum(1e-6, _or(rprice, one))
+    regimes = np.where(rv < 0.006, "Calm", np.where(rv > 0.018, "Hot", "Normal"))
+    cap = np.select([regimes == "Calm", regimes == "Hot"], [cp.cap_calm, cp.cap_hot], cp.cap_normal)
+    conf = np.minimum(num / den, cap)
+    if cp.max_spread_pct is not None:
+        conf = np.where(c["spread_pct"] > cp.max_spread_pct, conf * cp.spread_mult, conf)
+
+    # _trigger: donchian edge and ema9 when present (0 counts, missing does not)
+    rdon_l = _or(c["donch_lo"], c["donchian_lower"])
+    rdon_u = _or(c["donch_hi"], c["donchian_upper"])
+    trig = np.where(long_, np.fmax(rdon_u, c["ema9"]), np.fmin(rdon_l, c["ema9"]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bps = np.abs(trig - rprice) / rprice * 10000.0
+    has_bps = ~np.isnan(trig) & ~np.isnan(rprice) & (rprice != 0)
+
+    rows = []
+    for i, (sym, s) in enumerate(zip(syms, snaps)):
+        liq_reason = _universe_soft_reason(sym, cp)
+        liq_ok = liq_reason is None
+        cf = float(conf[i]) * (0.7 if not liq_ok else 1.0)
         rows.append({
-            "symbol": sym, "side": side, "score": round(score,1), "confidence": round(conf,2),
-            "age_s": round(s["_age_s"],1), "regime": regime, "delta_trigger_bps": d_bps,
-            "readiness": readiness, "block_reason": block_reason,
-            "checks": {"VWAPΔ": factors["vwap"] >= 0.5, "VolX": (s.get("vol_mult") or 1.0) >= 1.0, "Liquidity": liq_ok}
+            "symbol": sym, "side": "long" if long_[i] else "short", "score": round(float(score[i]), 1),
+            "_conf": max(0.0, min(1.0, cf)), "regime": str(regimes[i]),
+            "delta_trigger_bps": round(float(bps[i]), 1) if has_bps[i] else None, "_liq_reason": liq_reason,
+            "checks": {"VWAPΔ": bool(vwap_f[i] >= 0.5), "VolX": (s.get("vol_mult") or 1.0) >= 1.0, "Liquidity": liq_ok},
         })
+    return rows
+
+def _check_score_parity(syms: List[str], snaps: List[Dict], rows: List[Dict], cp: CompiledPolicy,
+                        tol: float = 0.11) -> int:
+    """
+    Re-score the first SCORE_PARITY_SAMPLE rows with the per-symbol _score_row and
+    log any that disagree with _score_rows beyond rounding. Returns the mismatch count.
+    """
+    bad = 0
+    for sym, s, row in list(zip(syms, snaps, rows))[:SCORE_PARITY_SAMPLE]:
+        ref = _score_row(sym, s, cp)
+        a, b = ref["delta_trigger_bps"], row["delta_trigger_bps"]
+        same = (ref["side"] == row["side"] and ref["regime"] == row["regime"] and ref["checks"] == row["checks"]
+                and abs(ref["score"] - row["score"]) <= tol and abs(ref["_conf"] - row["_conf"]) <= 1e-6
+                and (a is None) == (b is None) and (a is None or abs(a - b) <= tol))
+        if not same:
+            bad += 1
+            print(f"[score_parity] {sym} batch={row} ref={ref}", file=sys.stderr)
+    return bad
+
+def _finish_row(row: Dict, age_s: float, staleness: int, wstatus: str) -> Dict:
+    fresh_ok = age_s <= staleness
+    conf = row["_conf"] if fresh_ok else max(0.0, min(1.0, row["_conf"] * 0.3))  # _score_conf stale penalty
+    liq_reason, d_bps = row.get("_liq_reason"), row.get("delta_trigger_bps")
+
+    readiness, block_reason = "Wait", None
+    if not fresh_ok: readiness, block_reason = "Stale", "stale"
+    elif wstatus != "ok": readiness, block_reason = "Blocked", f"window:{wstatus}"
+    elif liq_reason is not None: readiness, block_reason = "Blocked", liq_reason
+    elif d_bps is not None: readiness = "Ready" if d_bps <= 20 else ("Near" if d_bps <= 60 else "Wait")
+
+    return {
+        "symbol": row["symbol"], "side": row["side"], "score": row["score"], "confidence": round(conf,2),
+        "age_s": round(age_s,1), "regime": row["regime"], "delta_trigger_bps": d_bps,
+        "readiness": readiness, "block_reason": block_reason, "checks": row["checks"],
+    }
+
+def plan(top_n: int = 10) -> Tuple[List[Dict], Dict]:
+    cp = get_policy()
+    staleness = cp.staleness_s
+    wstatus = window_status(cp)
+    rows, ages = [], []
+
+    got = read_snaps(list_active_symbols())
+    scored = _score_rows([sym for sym, _ in got], [s for _, s in got], cp)
+    if SCORE_PARITY_SAMPLE > 0:
+        _check_score_parity([sym for sym, _ in got], [s for _, s in got], scored, cp)
+    for (sym, s), row in zip(got, scored):
+        ages.append(s["_age_s"])
+        rows.append(_finish_row(row, s["_age_s"], staleness, wstatus))
 
     rows.sort(key=lambda x: x["score"], reverse=True)
+    _publish_top(rows)
     p95 = (statistics.quantiles(ages, n=20)[-1] if ages else 0.0)
-    return rows[:top_n], {"rev": rev, "snapshot_p95_age_s": p95, "window_status": wstatus}
+    return rows[:top_n], {"rev": cp.rev, "snapshot_p95_age_s": p95, "window_status": wstatus}
+
+# --- precomputed leaderboard (written by the ticker at minute close) ---
+# lb:{rev}        ZSET symbol -> score
+# lb:{rev}:rows   HASH symbol -> JSON _score_row
+# lb:{rev}:meta   HASH ts_ms of the last minute-close update
+def lb_key(rev: int) -> str: return f"lb:{rev}"
+
+def publish_leaderboard(pipe, cp: CompiledPolicy, snaps: Dict[str, Dict], gone: List[str] = ()) -> None:
+    """Queue score/row writes for snaps (symbol -> snapshot doc) and drop `gone` symbols."""
+    key = lb_key(cp.rev)
+    if snaps:
+        rows = {row["symbol"]: row for row in _score_rows(list(snaps), list(snaps.values()), cp)}
+        pipe.zadd(key, {sym: row["score"] for sym, row in rows.items()})
+        pipe.hset(f"{key}:rows", mapping={sym: json.dumps(row) for sym, row in rows.items()})
+    if gone:
+        pipe.zrem(key, *gone)
+        pipe.hdel(f"{key}:rows", *gone)
+    pipe.hset(f"{key}:meta", mapping={"ts_ms": now_ms()})
+    for k in (key, f"{key}:rows", f"{key}:meta"):
+        pipe.expire(k, LB_TTL_S)
+
+def plan_fast(top_n: int = 10) -> Optional[Tuple[List[Dict], Dict]]:
+    """
+    Top rows from the ticker's leaderboard: ZREVRANGE + HMGET, plus live ts_ms for
+    the returned symbols only. Members whose snapshot expired are skipped and the
+    ZSET is paged further down until top_n live rows (and everything tied with the
+    Nth) are collected, like plan() filling from lower ranks. None when the
+    leaderboard is missing or older than LB_MAX_AGE_S (ticker down), so callers
+    fall back to plan().
+    """
+    cp = get_policy()
+    rd = r()
+    key = lb_key(cp.rev)
+    ts = rd.hget(f"{key}:meta", "ts_ms")
+    if not ts or now_ms() - int(ts) > LB_MAX_AGE_S * 1000:
+        return None
+    staleness = cp.staleness_s
+    wstatus = window_status(cp)
+    rows, ages = [], []
+    page, off = max(top_n, 50), 0
+    while True:
+        batch = rd.zrevrange(key, off, off + page - 1, withscores=True)
+        if not batch:
+            break
+        off += len(batch)
+        syms = [m for m, _ in batch]
+        scored = {sym: raw for sym, raw in zip(syms, rd.hmget(f"{key}:rows", syms)) if raw}
+        for sym, s in read_snaps(list(scored), ("ts_ms",)):
+            ages.append(s["_age_s"])
+            rows.append(_finish_row(json.loads(scored[sym]), s["_age_s"], staleness, wstatus))
+        # Stop once top_n live rows are in hand and this page ran past every score
+        # tied with the Nth, so ties order by symbol exactly like plan().
+        if len(rows) >= top_n and batch[-1][1] < sorted((x["score"] for x in rows), reverse=True)[top_n - 1]:
+            break
+    if not off:
+        return None
+    rows.sort(key=lambda x: (-x["score"], x["symbol"]))
+    rows = rows[:top_n]
+    p95 = (statistics.quantiles(ages, n=20)[-1] if len(ages) > 1 else (ages[0] if ages else 0.0))
+    return rows, {"rev": cp.rev, "snapshot_p95_age_s": p95, "window_status": wstatus, "source": "leaderboard"}
+
+def _publish_top(rows: List[Dict]) -> None:
+    """Replace plan:top (symbol -> score) so the ticker can upgrade top-ranked symbols."""
+    try:
+        pipe = r().pipeline(transaction=True)
+        pipe.delete("plan:top")
+        if rows:
+            pipe.zadd("plan:top", {x["symbol"]: x["score"] for x in rows})
+            pipe.expire("plan:top", PLAN_TOP_TTL_S)
+        pipe.execute()
+    except Exception:
+        pass
 
 def analyze(symbol: str) -> Dict:
-    pol, rev = load_policy()
+    cp = get_policy()
     sym = symbol.replace(" ", "").upper()
-    s = read_snap(sym)
+    s = read_snap(sym, ANALYZE_FIELDS)
     if not s:
         return {"decision":"WAIT","score":0.0,"confidence":0.0,"bands":[1.0, 1.0],"action":{},"risk":{"atr":0.0,"rr":0.0,"delta_trigger_bps":0.0},"why":{"trend":0,"pullback":0,"vwap":0,"breakout":0,"volume":0,"checks":{}},"meta":{"age_s":None,"regime":"Normal","liquidity_ok":False}}
     price, atr, ema9, ema21, vwap = s.get("price") or s.get("last_price"), s.get("atr") or s.get("atr14"), s.get("ema9"), s.get("ema21"), s.get("vwap")
     don_l, don_u = s.get("donch_lo") or s.get("donchian_lower") or s.get("donchian_lo"), s.get("donch_hi") or s.get("donchian_upper") or s.get("donchian_hi")
     side = _side(ema9, ema21); regime = _regime(atr, price)
-    factors = _factors(s, pol)
-    fresh_ok = s["_age_s"] <= int(pol.get("staleness_s", 10))
-    liq_ok = _universe_soft_reason(sym, pol) is None
-    score, conf = _score_conf(factors, pol, regime, fresh_ok, liq_ok)
+    factors = _factors(s)
+    fresh_ok = s["_age_s"] <= cp.staleness_s
+    liq_ok = _universe_soft_reason(sym, cp) is None
+    score, conf = _score_conf(factors, cp, regime, fresh_ok, liq_ok, s.get("spread_pct"))
 
     # bracket
-    b = pol.get("bracket", {})
-    entry_chase = float(b.get("entry_chase_atr", 0.15)); tp1_atr = float(b.get("tp1_atr", 0.75))
-    tp2_atr = float(b.get("tp2_atr", 1.5)); stop_off = float(b.get("stop_vwap_offset_atr", 0.5))
+    entry_chase, tp1_atr, tp2_atr, stop_off = cp.entry_chase_atr, cp.tp1_atr, cp.tp2_atr, cp.stop_vwap_offset_atr
     trig = _trigger(side, ema9, don_l, don_u)
     action = {}
     delta_trigger_bps = 0.0
@@ -251,14 +620,55 @@ def analyze(symbol: str) -> Dict:
           "delta_trigger_bps": round(delta_trigger_bps, 1)
       },
       "why": {**factors, "checks":{"VWAPΔ": factors["vwap"]>=0.5, "VolX": (s.get("vol_mult") or s.get("minute_vol_multiple") or 1.0)>=1.0}},
-      "meta": {"age_s": round(s["_age_s"],1), "regime": regime, "liquidity_ok": liq_ok, "source": "live"}
+      "meta": {"age_s": round(s["_age_s"],1), "regime": regime, "liquidity_ok": liq_ok, "source": "live",
+               "spread_pct": s.get("spread_pct")},
+      "mtf": _mtf(s, side),
     }
 
+def _mtf(s: Dict, side: str) -> Dict:
+    """Completed higher-timeframe bars from the snapshot, with whether each trend agrees with `side`."""
+    out = {}
+    for tf in ROLLUP_TFS:
+        t = s.get(f"tf{tf}")
+        if not isinstance(t, dict):
+            continue
+        out[f"{tf}m"] = {
+            "trend": t.get("trend"), "aligned": (t.get("trend") == "up") == (side == "long"),
+            "close": t.get("c"), "ema9": t.get("ema9"), "ema21": t.get("ema21"),
+            "rsi14": t.get("rsi14"), "atr": t.get("atr"), "bars": t.get("bars"),
+        }
+    return out
+
+def shard_status(rd) -> List[Dict]:
+    """Per-shard liveness from ticker:shards + ticker:heartbeat:{id} (one entry per ticker process)."""
+    meta = rd.hgetall("ticker:shards") or {}
+    ids = sorted((k for k in meta if k.isdigit()), key=int)
+    if not ids:
+        return []
+    hbs = rd.mget([f"ticker:heartbeat:{i}" for i in ids])
+    now = now_ms()
+    out = []
+    for i, hb in zip(ids, hbs):
+        try:
+            m = json.loads(meta[i])
+        except Exception:
+            m = {}
+        hb_ms = int(hb or 0)
+        age = (now - hb_ms) / 1000.0 if hb_ms else None
+        out.append({
+            "id": int(i),
+            "alive": bool(hb_ms and (now - hb_ms) < 15000),
+            "age_s": None if age is None else round(age, 1),
+            "tokens": int(m.get("tokens") or 0),
+        })
+    return out
+
 def session_status() -> Dict:
-    pol, rev = load_policy()
+    cp = get_policy()
     rd = r()
     hb = rd.get("ticker:heartbeat")
     ticker = bool(hb and (now_ms() - int(hb)) < 15000)
+    shards = shard_status(rd)
 
     # Validate Zerodha token by calling profile() when an access_token exists.
     try:
@@ -277,10 +687,8 @@ def session_status() -> Dict:
 
     llm = bool(os.environ.get("OPENAI_API_KEY"))
     ages = []
-    for sym in rd.smembers("symbols:active") or []:
-        s = read_snap(sym)
-        if s:
-            ages.append(s["_age_s"])
+    for _, s in read_snaps(list(rd.smembers("symbols:active") or []), ("ts_ms",)):
+        ages.append(s["_age_s"])
     p95 = (statistics.quantiles(ages, n=20)[-1] if ages else 0.0)
 
     return {
@@ -289,9 +697,10 @@ def session_status() -> Dict:
         "llm": llm,
         "logged_in": zerodha_ok,
         "market_open": market_open_ist(),
-        "window_status": window_status(pol),
-        "degraded": bool(p95 and p95 > pol.get("staleness_s", 10)),
+        "window_status": window_status(cp),
+        "degraded": bool(p95 and p95 > cp.staleness_s) or any(not sh["alive"] for sh in shards),
         "snapshot_p95_age_s": round(p95 or 0.0, 1),
         "time_ist": time.strftime("%H:%M:%S", time.localtime()),
-        "rev": rev,
+        "rev": cp.rev,
+        "shards": shards,
     }
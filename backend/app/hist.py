@@ -12,8 +12,9 @@ except Exception:
 def _get_redis() -> Optional["redis.Redis"]:
     if redis is None: 
         return None
-    # docker-compose service name is "redis"
-    return redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+    # shared pool on REDIS_URL (docker-compose service name "redis" by default)
+    from .rl import redis_client
+    return redis_client()
 
 def _bars_key(symbol: str, date_yyyy_mm_dd: str) -> str:
     return f"bars:{symbol}:{date_yyyy_mm_dd}"
@@ -43,12 +44,13 @@ def write_bars_for_date(symbol: str, date_yyyy_mm_dd: str, bars: List[Dict[str,
 
 # -------- Public recording API (called by ticker) -----------------------------
 
-def record_minute_bar(symbol: str, bar: Dict[str, Any]) -> None:
+def record_minute_bar(symbol: str, bar: Dict[str, Any], pipe=None) -> None:
     """
     bar = {"ts": ISO8601, "o": float, "h": float, "l": float, "c": float, "v": int}
     Appends to a Redis list. Harmless no-op if redis isn't available.
+    Pass a pipeline as `pipe` to batch the RPUSH/EXPIRE with the caller's writes.
     """
-    r = _get_redis()
+    r = pipe if pipe is not None else _get_redis()
     if not r: 
         return
     ts = bar.get("ts")
@@ -472,14 +474,11 @@ def _get_cached_instruments(ks, exchange: str = None):
         # Still return the stale cache, but try to refresh async if possible
         return _INSTRUMENTS_CACHE[cache_key]
     
-    # Fetch from API only if no cache exists at all
+    # Load via the shared per-day instrument master (Redis, then Kite API) only if no cache exists at all
     try:
-        if exchange:
-            log.info(f"[CACHE] 🔄 Fetching instruments for {exchange} from Kite API (first time)...")
-            instruments = ks.instruments(exchange)
-        else:
-            log.info(f"[CACHE] 🔄 Fetching ALL instruments from Kite API (first time)...")
-            instruments = ks.instruments()
+        from . import instruments as inst_master
+        log.info(f"[CACHE] 🔄 Loading instruments for {cache_key} from the shared instrument master...")
+        instruments = inst_master.get(ks, exchange)
         
         if instruments and isinstance(instruments, list):
             _INSTRUMENTS_CACHE[cache_key] = instruments
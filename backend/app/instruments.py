@@ -0,0 +1,202 @@
+"""
+Instrument master cache shared by the ticker and the API.
+
+Kite publishes the instrument dump once a day (around 08:30 IST), so each
+exchange's dump is downloaded at most once per dump day and kept in two layers:
+
+  memory  - parsed rows per exchange in this process
+  Redis   - inst:master:{EXCH}:{YYYY-MM-DD}, a compact JSON form
+            {"fields": [...], "rows": [[...], ...]} without per-row keys or
+            last_price, shared by every ticker shard and API worker
+
+    rows = instruments.get(kite, "NSE")      # list of instrument dicts
+
+A dump day starts at INST_PUBLISH_HHMM IST rather than midnight, so a process
+starting before the new dump is out does not file yesterday's rows under
+today's key. When a download fails the newest rows this process holds are
+returned, even from an earlier day, so lookups degrade to a stale master
+instead of nothing. An empty dump is kept in Redis for INST_EMPTY_TTL_S only.
+
+write_map() publishes the derived inst:* hashes in chunks into a temporary
+key and RENAMEs it into place, and skips the write when the content digest
+matches the last one published.
+"""
+from __future__ import annotations
+import os, sys, json, time, hashlib, threading
+from datetime import datetime, date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from .rl import redis_client
+
+IST = ZoneInfo("Asia/Kolkata")
+MASTER_TTL_S = int(os.getenv("INST_MASTER_TTL_S", str(36 * 3600)))
+EMPTY_TTL_S = int(os.getenv("INST_EMPTY_TTL_S", "300"))  # retry an empty dump soon instead of next day
+PUBLISH_HHMM = os.getenv("INST_PUBLISH_HHMM", "08:30")  # when Kite's new dump is out
+MAP_CHUNK = int(os.getenv("INST_MAP_CHUNK", "5000"))
+FETCH_LOCK_S = 60  # one process downloads a given dump; others wait for its Redis copy
+
+FIELDS = (
+    "instrument_token", "exchange_token", "tradingsymbol", "name", "instrument_type",
+    "segment", "exchange", "tick_size", "lot_size", "expiry", "strike", "isin",
+)
+
+_lock = threading.Lock()
+_mem: Dict[str, Tuple[str, List[dict]]] = {}  # exchange -> (day, rows)
+
+
+def trading_day() -> str:
+    """Dump day: today's date from PUBLISH_HHMM IST onwards, yesterday's before it."""
+    now = datetime.now(tz=IST)
+    h, m = (int(x) for x in PUBLISH_HHMM.split(":"))
+    if (now.hour, now.minute) < (h, m):
+        now -= timedelta(days=1)
+    return now.date().isoformat()
+
+def master_key(exchange: Optional[str], day: str) -> str:
+    return f"inst:master:{exchange or 'ALL'}:{day}"
+
+
+def _compact(rows: List[dict]) -> str:
+    out = []
+    for inst in rows:
+        row = []
+        for f in FIELDS:
+            v = inst.get(f)
+            if isinstance(v, (date, datetime)):
+                v = v.isoformat()
+            row.append(v)
+        out.append(row)
+    return json.dumps({"fields": FIELDS, "rows": out}, separators=(",", ":"))
+
+def _expand(raw: str) -> List[dict]:
+    doc = json.loads(raw)
+    fields = doc["fields"]
+    return [dict(zip(fields, row)) for row in doc["rows"]]
+
+
+def _from_redis(r, key: str) -> Optional[List[dict]]:
+    try:
+        raw = r.get(key)
+        return _expand(raw) if raw else None
+    except Exception as e:
+        print(f"[instruments] unreadable {key}: {e}", file=sys.stderr)
+        return None
+
+def _download(kite, exchange: Optional[str]) -> List[dict]:
+    rows = kite.instruments(exchange) if exchange else kite.instruments()
+    if not isinstance(rows, list):
+        raise ValueError(f"unexpected instruments response: {type(rows).__name__}")
+    return rows
+
+
+def get(kite, exchange: Optional[str] = None, r=None) -> List[dict]:
+    """Instrument rows for exchange (None = all exchanges), cached for the dump day."""
+    ex = exchange or "ALL"
+    day = trading_day()
+    with _lock:
+        hit = _mem.get(ex)
+    if hit and hit[0] == day:
+        return hit[1]
+
+    r = r or redis_client()
+    key = master_key(exchange, day)
+    rows = _from_redis(r, key)
+    if rows is None:
+        rows = _fetch_shared(kite, exchange, r, key)
+    if rows:
+        with _lock:
+            _mem[ex] = (day, rows)
+        return rows
+    if hit:
+        print(f"[instruments] using {hit[0]} master for {ex} ({len(hit[1])} rows)", file=sys.stderr)
+        return hit[1]
+    return []
+
+def _fetch_shared(kite, exchange: Optional[str], r, key: str) -> Optional[List[dict]]:
+    """Download once across processes: the lock holder fetches, the rest poll its result."""
+    lock = f"{key}:lock"
+    got = False
+    try:
+        got = bool(r.set(lock, os.getpid(), nx=True, ex=FETCH_LOCK_S))
+    except Exception:
+        got = True  # no Redis: just download
+    if not got:
+        deadline = time.time() + FETCH_LOCK_S
+        while time.time() < deadline:
+            time.sleep(0.5)
+            rows = _from_redis(r, key)
+            if rows is not None:
+                return rows
+            if not r.exists(lock):
+                break
+    try:
+        t0 = time.perf_counter()
+        rows = _download(kite, exchange)
+        try:
+            r.set(key, _compact(rows), ex=MASTER_TTL_S if rows else EMPTY_TTL_S)
+        except Exception as e:
+            print(f"[instruments] could not cache {key}: {e}", file=sys.stderr)
+        print(f"[instruments] downloaded {exchange or 'ALL'}: {len(rows)} rows in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        return rows
+    except Exception as e:
+        print(f"[instruments] download failed for {exchange or 'ALL'}: {e}", file=sys.stderr)
+        return None
+    finally:
+        if got:
+            try:
+                r.delete(lock)
+            except Exception:
+                pass
+
+
+def invalidate(exchange: Optional[str] = None, r=None) -> None:
+    """Drop today's cached master for exchange (None = every exchange) so the next get() downloads."""
+    r = r or redis_client()
+    with _lock:
+        if exchange:
+            _mem.pop(exchange, None)
+        else:
+            _mem.clear()
+    day = trading_day()
+    try:
+        if exchange:
+            r.delete(master_key(exchange, day))
+        else:
+            keys = list(r.scan_iter(match=f"inst:master:*:{day}"))
+            if keys:
+                r.delete(*keys)
+    except Exception as e:
+        print(f"[instruments] invalidate failed: {e}", file=sys.stderr)
+
+
+# ---------- inst:* map publishing ----------
+def _digest(mapping: Dict[Any, Any]) -> str:
+    h = hashlib.sha1()
+    for k, v in sorted((str(k), str(v)) for k, v in mapping.items()):
+        h.update(f"{k}\t{v}\n".encode())
+    return h.hexdigest()
+
+def write_map(r, key: str, mapping: Dict[Any, Any], chunk: int = MAP_CHUNK) -> bool:
+    """
+    Replace hash `key` with mapping unless its digest is unchanged. Writes go to
+    {key}:tmp in HSET chunks and RENAME over key, so readers never see a partial
+    map; an empty mapping deletes it. Returns True when the hash was rewritten.
+    """
+    dkey = f"{key}:digest"
+    if not mapping:
+        return bool(r.delete(key, dkey))
+    digest = _digest(mapping)
+    if r.get(dkey) == digest and r.exists(key):
+        return False
+    tmp = f"{key}:tmp"
+    items = [(str(k), str(v)) for k, v in mapping.items()]
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(tmp)
+    for i in range(0, len(items), chunk):
+        pipe.hset(tmp, mapping=dict(items[i:i + chunk]))
+        pipe.execute()
+    pipe.rename(tmp, key)
+    pipe.set(dkey, digest)
+    pipe.execute()
+    return True
@@ -10,7 +10,7 @@ from typing import Any, Dict, List, Iterable
 from zoneinfo import ZoneInfo
 from fastapi import FastAPI, HTTPException, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 
@@ -20,7 +20,10 @@ from .utils import rid
 from .rl import redis_client, token_bucket
 from .models import APIResponse, Policy, HintIn
 from .kite import get_kite
-from .engine import plan, minute_snapshot
+from .engine import plan, minute_snapshot, minute_snapshots
+from . import snapstore
+from . import instruments
+from . import metrics
 from . import llm
 from . import contextual_tips
 from .api_v2 import router as api_v2_router
@@ -221,6 +224,21 @@ def healthz():
     return {"redis": ok, "time": ist_now().isoformat()}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Ticker pipeline metrics (published per shard to metrics:ticker:{id}) in Prometheus text format."""
+    try:
+        shard_ids = sorted(_smembers_str(r.hkeys("ticker:shards")) or ["0"], key=lambda x: int(x) if x.isdigit() else 0)
+        pipe = r.pipeline(transaction=False)
+        for sid in shard_ids:
+            pipe.hgetall(f"metrics:ticker:{sid}")
+        docs = pipe.execute()
+    except Exception:
+        log.exception("failed reading ticker metrics")
+        raise HTTPException(status_code=503, detail="metrics unavailable")
+    return metrics.render_prometheus(({"shard": sid}, doc) for sid, doc in zip(shard_ids, docs))
+
+
 # ---------- Session / OAuth ----------
 @app.get("/api/session")
 def api_session():
@@ -309,13 +327,14 @@ def api_live(symbols: str):
     if not ok:
         raise HTTPException(status_code=429, detail="rate limited", headers={"Retry-After": str(int(round(wait)))})
     out: Dict[str, Any] = {}
-    for s in [x for x in (symbols or "").split(",") if x.strip()]:
-        cs = _clean_symbol(s)
-        try:
-            out[cs] = minute_snapshot(cs)
-        except Exception:
-            log.exception("minute_snapshot failed symbol=%s", cs)
-            out[cs] = {"error": "stale_or_missing"}
+    syms = list(dict.fromkeys(_clean_symbol(s) for s in (symbols or "").split(",") if s.strip()))
+    try:
+        snaps = minute_snapshots(syms)
+    except Exception:
+        log.exception("minute_snapshots failed symbols=%s", ",".join(syms))
+        snaps = {}
+    for cs in syms:
+        out[cs] = snaps.get(cs) or {"error": "stale_or_missing"}
     return {"ok": True, "request_id": rid(), "duration_ms": 0, "data": out}
 
 
@@ -329,8 +348,10 @@ def api_bars(symbol: str = Query(...), limit: int = Query(120, ge=1, le=480)):
         bars = [b for b in bars if b is not None]
     except Exception:
         bars = []
-    snap_raw = r.get(f"snap:{symbol}")
-    indicators = _json_loads_or(snap_raw, {})
+    try:
+        indicators = snapstore.read_snap(r, symbol) or {}
+    except Exception:
+        indicators = {}
     return {"ok": True, "request_id": rid(), "duration_ms": 0, "data": {"bars": bars, "indicators": indicators}}
 
 
@@ -461,16 +482,18 @@ def api_journal():
 def api_get_config():
     try:
         pinned = sorted(_smembers_str(r.smembers("cfg:pinned")))
+        watchlist = sorted(_smembers_str(r.smembers("cfg:watchlist")))
     except Exception:
-        pinned = []
+        pinned, watchlist = [], []
     limit = _get_int(r.get("cfg:universe_limit"), DEFAULT_UNIVERSE_LIMIT)
-    return {"pinned": pinned, "universe_limit": limit}
+    return {"pinned": pinned, "watchlist": watchlist, "universe_limit": limit}
 
 
 @app.post("/api/config")
 def api_set_config(
     pinned: List[str] | None = Body(default=None),
     universe_limit: int | None = Body(default=None),
+    watchlist: List[str] | None = Body(default=None),
 ):
     if pinned is not None:
         try:
@@ -479,6 +502,13 @@ def api_set_config(
                 r.sadd("cfg:pinned", *[p.strip() for p in pinned if p.strip()])
         except Exception:
             log.exception("failed updating cfg:pinned")
+    if watchlist is not None:
+        try:
+            r.delete("cfg:watchlist")
+            if watchlist:
+                r.sadd("cfg:watchlist", *[w.strip() for w in watchlist if w.strip()])
+        except Exception:
+            log.exception("failed updating cfg:watchlist")
     if universe_limit is not None:
         try:
             r.set("cfg:universe_limit", int(universe_limit))
@@ -548,6 +578,10 @@ def _find_token(exchange: str, tradingsymbol: str) -> int | None:
     try:
         ts_full = f"{exchange}:{tradingsymbol}"
         tok = r.hget("inst:sym2token", ts_full)
+        if not tok:
+            # duplicate listings are dropped from sym2token; use the streamed one
+            primary = r.hget(snapstore.ALIAS_KEY, ts_full)
+            tok = r.hget("inst:sym2token", primary) if primary else None
         if tok:
             return int(tok)
     except Exception:
@@ -555,7 +589,7 @@ def _find_token(exchange: str, tradingsymbol: str) -> int | None:
     # 2) fall back to scanning instruments from Kite
     try:
         ks = get_kite().kite
-        inst = ks.instruments(exchange)
+        inst = instruments.get(ks, exchange, r)
         # try exact match
         for it in inst:
             if str(it.get("tradingsymbol","")).upper() == tradingsymbol:
@@ -651,6 +685,7 @@ if DEBUG_ENABLED:
             hb = 0
         return {
             "pinned": _smembers_str(r.smembers("cfg:pinned") or []),
+            "watchlist": _smembers_str(r.smembers("cfg:watchlist") or []),
             "universe_limit": _get_int(r.get("cfg:universe_limit"), DEFAULT_UNIVERSE_LIMIT),
             "symbols_active": subs,
             "ticker_alive": hb,
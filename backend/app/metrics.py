@@ -0,0 +1,150 @@
+"""
+Minimal in-process metrics for the ticker (no prometheus_client dependency).
+
+The ticker records into a Registry, and publish() copies the registry into the
+Redis hash metrics:ticker:{shard}. The API's /metrics endpoint then renders every
+shard's hash as Prometheus text. Hash fields are series names, with the sample
+value as the field value:
+
+    ticker_ticks_total                          -> "182734"
+    ticker_minute_close_seconds_bucket{le="0.1"} -> "57"
+    #type:ticker_minute_close_seconds            -> "histogram"
+"""
+from __future__ import annotations
+import bisect, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets (seconds): sub-millisecond callbacks up to multi-second stalls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name, self.help = name, help
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self.value += n
+
+    def samples(self) -> List[Tuple[str, float]]:
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name, self.help = name, help
+        self.value = 0.0
+
+    def set(self, v: float):
+        self.value = float(v)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        return [(self.name, self.value)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+            self.count += 1
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        out, acc = [], 0
+        for le, c in zip(self.buckets, counts):
+            acc += c
+            out.append((f'{self.name}_bucket{{le="{le:g}"}}', acc))
+        out.append((f'{self.name}_bucket{{le="+Inf"}}', n))
+        out.append((f"{self.name}_sum", total))
+        out.append((f"{self.name}_count", n))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _add(self, m):
+        return self._metrics.setdefault(m.name, m)
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._add(Counter(name, help))
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._add(Gauge(name, help))
+
+    def histogram(self, name: str, help: str = "", buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, buckets))
+
+    def to_hash(self) -> Dict[str, str]:
+        doc: Dict[str, str] = {}
+        for m in self._metrics.values():
+            doc[f"#type:{m.name}"] = m.kind
+            if m.help:
+                doc[f"#help:{m.name}"] = m.help
+            for series, v in m.samples():
+                doc[series] = repr(float(v))
+        return doc
+
+    def publish(self, pipe, key: str, ttl: int = 300):
+        pipe.hset(key, mapping=self.to_hash())
+        pipe.expire(key, ttl)
+
+
+def _with_labels(series: str, labels: str) -> str:
+    if not labels:
+        return series
+    if series.endswith("}"):
+        return f"{series[:-1]},{labels}}}"
+    return f"{series}{{{labels}}}"
+
+
+def render_prometheus(docs: Iterable[Tuple[Dict[str, str], Optional[Dict[str, str]]]]) -> str:
+    """Render (labels, published hash) pairs as one Prometheus text exposition."""
+    types: Dict[str, str] = {}
+    helps: Dict[str, str] = {}
+    lines: Dict[str, List[str]] = {}
+    for labels, doc in docs:
+        if not doc:
+            continue
+        lab = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        for field, v in doc.items():
+            if field.startswith("#type:"):
+                types[field[6:]] = v
+            elif field.startswith("#help:"):
+                helps[field[6:]] = v
+        for field, v in doc.items():
+            if field.startswith("#"):
+                continue
+            base = field.split("{", 1)[0]
+            for suffix in ("_bucket", "_sum", "_count"):
+                if base.endswith(suffix) and types.get(base[:-len(suffix)]) == "histogram":
+                    base = base[:-len(suffix)]
+                    break
+            lines.setdefault(base, []).append(f"{_with_labels(field, lab)} {v}")
+    out: List[str] = []
+    for base in sorted(lines):
+        if base in helps:
+            out.append(f"# HELP {base} {helps[base]}")
+        out.append(f"# TYPE {base} {types.get(base, 'untyped')}")
+        out.extend(lines[base])
+    return "\n".join(out) + "\n"
@@ -27,11 +27,18 @@ class AnalyzeResponseV2(BaseModel):
     risk: Dict[str, float]  # Added risk object with atr, rr, delta_trigger_bps
     why: Dict[str, object]
     meta: Dict[str, object]
+    mtf: Dict[str, Dict[str, object]] = {}  # "5m"/"15m"/"60m" completed-bar trend context
 
 class Policy(BaseModel):
     rev: int
     body: Dict[str, object]
 
+class ShardStatusV2(BaseModel):
+    id: int
+    alive: bool
+    age_s: Optional[float] = None
+    tokens: int = 0
+
 class SessionStatusV2(BaseModel):
     zerodha: bool
     ticker: bool
@@ -43,3 +50,4 @@ class SessionStatusV2(BaseModel):
     snapshot_p95_age_s: float
     time_ist: str
     rev: int
+    shards: List[ShardStatusV2] = []
@@ -1,22 +1,36 @@
 
-import redis, os, time
-_pool=None
+import redis, os, time, threading
+# One connection pool per (url, decode_responses) per process, shared by every module.
+# redis-py pools are fork-aware, so ticker shard processes get their own sockets.
+DEFAULT_REDIS_URL="redis://redis:6379/0"
+REDIS_MAX_CONNECTIONS=int(os.getenv("REDIS_MAX_CONNECTIONS","64"))
+# Blocking pools: once max_connections are checked out, callers wait up to this long for one.
+REDIS_POOL_TIMEOUT=float(os.getenv("REDIS_POOL_TIMEOUT","10"))
+_POOL_KW=dict(
+    socket_connect_timeout=float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT","5")),
+    socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT","5")),
+    retry_on_timeout=True,
+    health_check_interval=30,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+)
+_clients={}; _lock=threading.Lock()
+def _url(url): return url or os.getenv("REDIS_URL",DEFAULT_REDIS_URL)
 def redis_client(url=None, decode_responses=True):
-    global _pool
-    if _pool is None:
-        try:
-            _pool = redis.from_url(
-                url or os.getenv("REDIS_URL","redis://localhost:6379/0"), 
-                decode_responses=decode_responses,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
-        except Exception as e:
-            print(f"Redis connection error: {e}")
-            raise
-    return _pool
+    """Shared sync client; clients for the same url/decoding share one pool."""
+    key=(_url(url), decode_responses)
+    c=_clients.get(key)
+    if c is None:
+        with _lock:
+            c=_clients.get(key)
+            if c is None:
+                try:
+                    pool=redis.BlockingConnectionPool.from_url(key[0], decode_responses=decode_responses, **_POOL_KW)
+                    c=_clients[key]=redis.Redis(connection_pool=pool)
+                except Exception as e:
+                    print(f"Redis connection error: {e}")
+                    raise
+    return c
 def token_bucket(key, capacity:int, refill_rate:float):
     r=redis_client(); now=time.time()
     st=r.hgetall(key) or {}
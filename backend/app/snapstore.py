@@ -0,0 +1,130 @@
+"""
+Live snapshot storage (snap:{sym}).
+
+SNAP_STORE selects the layout written by the ticker and read by the engines:
+  json  - one JSON document at snap:{sym} (legacy, default)
+  hash  - one Redis hash at snaph:{sym}; each field holds a JSON-encoded value,
+          so ticks can HSET last_price/ts_ms without touching indicator fields
+  both  - write both layouts while readers migrate; readers prefer the hash
+
+Readers fall back to the JSON document when the hash is missing, so flipping
+SNAP_STORE never blanks the dashboard.
+"""
+from __future__ import annotations
+import os, json
+from typing import Any, Dict, List, Optional, Sequence
+
+SNAP_STORE = os.getenv("SNAP_STORE", "json").strip().lower()
+if SNAP_STORE not in ("json", "hash", "both"):
+    SNAP_STORE = "json"
+READ_CHUNK = int(os.getenv("SNAP_READ_CHUNK", "500"))  # keys per MGET/pipeline in read_snaps
+
+
+ALIAS_KEY = "inst:alias"  # duplicate listing -> streamed listing, written by the ticker
+
+
+def snap_key(sym: str) -> str:
+    return f"snap:{sym}"
+
+def snap_hash_key(sym: str) -> str:
+    return f"snaph:{sym}"
+
+def writes_json() -> bool:
+    return SNAP_STORE in ("json", "both")
+
+def writes_hash() -> bool:
+    return SNAP_STORE in ("hash", "both")
+
+
+def _dec(raw: Any) -> Any:
+    try:
+        return json.loads(raw)
+    except Exception:
+        return raw
+
+
+# ---------- writers (pipeline-friendly) ----------
+def put_json(pipe, sym: str, doc: Dict[str, Any], ttl: int) -> None:
+    pipe.setex(snap_key(sym), ttl, json.dumps(doc))
+
+def put_fields(pipe, sym: str, fields: Dict[str, Any], ttl: int) -> None:
+    """HSET only the given fields (partial update) and refresh the TTL."""
+    if not fields:
+        return
+    key = snap_hash_key(sym)
+    pipe.hset(key, mapping={k: json.dumps(v) for k, v in fields.items()})
+    pipe.expire(key, ttl)
+
+def put_snap(pipe, sym: str, doc: Dict[str, Any], ttl: int) -> None:
+    """Write a full snapshot in every layout enabled by SNAP_STORE."""
+    if writes_json():
+        put_json(pipe, sym, doc, ttl)
+    if writes_hash():
+        put_fields(pipe, sym, doc, ttl)
+
+
+# ---------- readers ----------
+def read_snap(r, sym: str, fields: Optional[Sequence[str]] = None, _alias: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Return the snapshot for sym, or None. With fields, hash-mode reads HMGET
+    just those fields; the JSON layout always parses the whole document.
+    A duplicate listing (inst:alias, e.g. BSE:INFY -> NSE:INFY) resolves to
+    the streamed listing's snapshot.
+    """
+    if writes_hash():
+        if fields:
+            vals = r.hmget(snap_hash_key(sym), list(fields))
+            doc = {f: _dec(v) for f, v in zip(fields, vals) if v is not None}
+        else:
+            doc = {k: _dec(v) for k, v in (r.hgetall(snap_hash_key(sym)) or {}).items()}
+        if doc:
+            return doc
+    raw = r.get(snap_key(sym))
+    if not raw:
+        primary = r.hget(ALIAS_KEY, sym) if _alias else None
+        return read_snap(r, primary, fields, _alias=False) if primary else None
+    return json.loads(raw)
+
+def read_snaps(r, syms: Sequence[str], fields: Optional[Sequence[str]] = None,
+               chunk: int = READ_CHUNK, _alias: bool = True) -> List[Optional[Dict[str, Any]]]:
+    """
+    Batched read_snap: snapshots for syms (None where missing), in order.
+    Each chunk costs one pipeline of HMGET/HGETALL in hash mode and one MGET
+    for JSON documents, so N symbols take about N / chunk round trips.
+    """
+    syms = list(syms)
+    out: List[Optional[Dict[str, Any]]] = [None] * len(syms)
+    for lo in range(0, len(syms), chunk):
+        part = syms[lo:lo + chunk]
+        missing = list(range(len(part)))
+        if writes_hash():
+            pipe = r.pipeline(transaction=False)
+            for sym in part:
+                if fields:
+                    pipe.hmget(snap_hash_key(sym), list(fields))
+                else:
+                    pipe.hgetall(snap_hash_key(sym))
+            missing = []
+            for i, res in enumerate(pipe.execute()):
+                if fields:
+                    doc = {f: _dec(v) for f, v in zip(fields, res) if v is not None}
+                else:
+                    doc = {k: _dec(v) for k, v in (res or {}).items()}
+                if doc:
+                    out[lo + i] = doc
+                else:
+                    missing.append(i)
+        if missing:
+            for i, raw in zip(missing, r.mget([snap_key(part[i]) for i in missing])):
+                if raw:
+                    out[lo + i] = json.loads(raw)
+    if _alias:
+        miss = [i for i, doc in enumerate(out) if doc is None]
+        if miss:
+            primaries = r.hmget(ALIAS_KEY, [syms[i] for i in miss])
+            hits = [(i, p) for i, p in zip(miss, primaries) if p]
+            if hits:
+                docs = read_snaps(r, [p for _, p in hits], fields, chunk, _alias=False)
+                for (i, _), doc in zip(hits, docs):
+                    out[i] = doc
+    return out
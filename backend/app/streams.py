@@ -0,0 +1,103 @@
+"""
+Redis Streams fan-out from the ticker.
+
+  stream:bars   one entry per finalized minute bar (always on unless STREAM_BARS_MAXLEN=0)
+  stream:ticks  one entry per symbol per snapshot flush, i.e. ticks coalesced to
+                SNAP_FLUSH_MS (off unless STREAM_TICKS=1)
+
+Both are capped with approximate MAXLEN trimming. Consumers use consumer
+groups, so several processes share one stream and a restarted consumer resumes
+from its last acknowledged ID:
+
+    streams.ensure_group(r, streams.BARS_STREAM, "alerts")
+    for sid, bar in streams.read_group(r, streams.BARS_STREAM, "alerts", "alerts-1"):
+        handle(bar)
+        streams.ack(r, streams.BARS_STREAM, "alerts", sid)
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+BARS_STREAM = os.getenv("STREAM_BARS_KEY", "stream:bars")
+TICKS_STREAM = os.getenv("STREAM_TICKS_KEY", "stream:ticks")
+BARS_MAXLEN = int(os.getenv("STREAM_BARS_MAXLEN", "200000"))
+TICKS_MAXLEN = int(os.getenv("STREAM_TICKS_MAXLEN", "500000"))
+TICKS_ENABLED = os.getenv("STREAM_TICKS", "0") in ("1", "true", "yes")
+CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", "60000"))
+
+
+def bars_enabled() -> bool:
+    return BARS_MAXLEN > 0
+
+def ticks_enabled() -> bool:
+    return TICKS_ENABLED and TICKS_MAXLEN > 0
+
+
+# ---------- producers (pipeline-friendly) ----------
+def add_bar(pipe, sym: str, doc: Dict[str, Any]) -> None:
+    """XADD one archive-shaped bar ({"ts","o","h","l","c","v"}) for sym."""
+    if not bars_enabled():
+        return
+    fields = {"sym": sym}
+    fields.update({k: str(v) for k, v in doc.items()})
+    pipe.xadd(BARS_STREAM, fields, maxlen=BARS_MAXLEN, approximate=True)
+
+def add_tick(pipe, sym: str, last_price: Any, ts_ms: Any) -> None:
+    if not ticks_enabled() or last_price is None:
+        return
+    pipe.xadd(TICKS_STREAM, {"sym": sym, "last_price": str(last_price), "ts_ms": str(ts_ms or 0)},
+              maxlen=TICKS_MAXLEN, approximate=True)
+
+
+# ---------- consumers ----------
+def ensure_group(r, stream: str, group: str, start_id: str = "$") -> None:
+    """Create the consumer group (and the stream) if missing; start_id="0" replays history."""
+    try:
+        r.xgroup_create(stream, group, id=start_id, mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+def read_group(r, stream: str, group: str, consumer: str,
+               count: int = 100, block_ms: int = 2000) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Yield (id, fields) forever. On start, re-delivers this consumer's own pending
+    entries, then claims entries other consumers left idle for CLAIM_IDLE_MS, then
+    follows new entries. Callers ack() after handling each entry.
+
+    block_ms is capped a second below the client's socket_timeout, otherwise an
+    idle XREADGROUP would time out on the socket instead of returning empty.
+    """
+    sock_s = r.connection_pool.connection_kwargs.get("socket_timeout")
+    if sock_s:
+        block_ms = max(100, min(block_ms, int(sock_s * 1000) - 1000))
+    # Our own unacked backlog from before a crash.
+    last = "0"
+    while True:
+        resp = r.xreadgroup(group, consumer, {stream: last}, count=count)
+        entries = resp[0][1] if resp else []
+        if not entries:
+            break
+        for sid, fields in entries:
+            yield sid, fields
+        last = entries[-1][0]
+
+    # Entries stranded on dead consumers.
+    cursor = "0-0"
+    while True:
+        res = r.xautoclaim(stream, group, consumer, min_idle_time=CLAIM_IDLE_MS, start_id=cursor, count=count)
+        cursor, entries = res[0], res[1]
+        for sid, fields in entries:
+            if fields:
+                yield sid, fields
+        if not entries or cursor in ("0-0", b"0-0"):
+            break
+
+    while True:
+        resp = r.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms)
+        for _, entries in resp or []:
+            for sid, fields in entries:
+                yield sid, fields
+
+def ack(r, stream: str, group: str, *ids: str) -> int:
+    return r.xack(stream, group, *ids) if ids else 0
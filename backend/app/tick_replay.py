@@ -0,0 +1,93 @@
+"""
+Replay a raw tick capture (see tickcap / TICK_CAPTURE_DIR) through TickerDaemon's
+ingest path to benchmark throughput and latency off-hours.
+
+    python -m app.tick_replay data/ticks/ticks-20250102-s0.bin --speed 10
+    python -m app.tick_replay data/ticks/ticks-20250102-s0.bin --speed max
+
+Batches go through _on_ticks into the real TickQueue and ingest worker, which
+writes snapshots, bars and archives to REDIS_URL. Point REDIS_URL at a scratch
+Redis that holds the inst:* maps from a live run, never at production.
+The daemon clock follows recorded time: at 1x/10x it advances with scaled wall
+time, at max speed it tracks the newest batch the worker has processed, so
+minutes close exactly as they did live.
+"""
+from __future__ import annotations
+import argparse, sys, threading, time
+from typing import Optional
+
+from . import tickcap
+from .ticker_daemon import TickerDaemon
+
+
+class ReplayClock:
+    """Recorded epoch ms: t0 + elapsed wall time * speed (speed None = follow the worker)."""
+    def __init__(self, t0_ms: int, speed: Optional[float], daemon: TickerDaemon):
+        self.t0_ms, self.speed, self.d = t0_ms, speed, daemon
+        self.m0 = time.monotonic()
+
+    def __call__(self) -> int:
+        if self.speed is None:
+            return max(self.t0_ms, self.d._last_recv_ms)
+        return self.t0_ms + int((time.monotonic() - self.m0) * 1000 * self.speed)
+
+
+def replay(path: str, speed: Optional[float], shard_id: int = 0) -> dict:
+    recs = tickcap.open_capture(path)
+    if not len(recs):
+        raise SystemExit(f"{path}: no records")
+    d = TickerDaemon(shard_id=shard_id, offline=True)
+    clock = ReplayClock(int(recs["recv_ms"][0]), speed, d)
+    d.set_clock(clock)
+
+    worker = threading.Thread(target=d._ingest_loop, name="tick-ingest", daemon=True)
+    worker.start()
+
+    batches = ticks = 0
+    max_behind_ms = 0  # how far the worker lagged behind the feed, in recorded ms
+    w0 = time.monotonic()
+    for recv_ms, batch in tickcap.iter_batches(recs):
+        if speed is not None:
+            wait = (recv_ms - clock()) / 1000.0 / speed
+            if wait > 0:
+                time.sleep(wait)
+            if d._last_recv_ms:
+                max_behind_ms = max(max_behind_ms, clock() - d._last_recv_ms)
+        d._on_ticks(None, batch, recv_ms)
+        batches += 1
+        ticks += len(batch)
+
+    # Let the worker drain, then close the final minutes as if the session went quiet.
+    last_ms = int(recs["recv_ms"][-1])
+    while len(d._tick_q) or d._last_recv_ms < last_ms:
+        time.sleep(0.01)
+    wall_s = time.monotonic() - w0
+    d._stop.set()
+    worker.join(timeout=5)
+    d._close_due_minutes(last_ms + 120_000)
+    d._flush_snaps()
+
+    q = d._tick_q
+    return {
+        "file": path, "speed": speed or "max", "batches": batches, "ticks": ticks,
+        "recorded_s": round((last_ms - int(recs["recv_ms"][0])) / 1000, 1),
+        "wall_s": round(wall_s, 2), "ticks_per_s": round(ticks / wall_s, 1) if wall_s else None,
+        "max_behind_ms": max_behind_ms, "queue_high_water": q.high_water,
+        "dropped": q.dropped, "coalesced": q.coalesced, "late_ticks": d._late_ticks,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path")
+    ap.add_argument("--speed", default="1", help="1, 10, any multiplier, or 'max'")
+    ap.add_argument("--shard", type=int, default=0)
+    a = ap.parse_args(argv)
+    speed = None if a.speed == "max" else float(a.speed)
+    stats = replay(a.path, speed, a.shard)
+    for k, v in stats.items():
+        print(f"{k:>16}: {v}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
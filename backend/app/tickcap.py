@@ -0,0 +1,125 @@
+"""
+Raw tick capture files.
+
+One file per session and shard (ticks-YYYYMMDD-s{shard}.bin) holding a 16-byte
+header followed by fixed-size little-endian records (TICK_DTYPE), so a capture
+can be memory-mapped and sliced without parsing:
+
+    recs = tickcap.open_capture(path)      # np.memmap of TICK_DTYPE
+    for recv_ms, ticks in tickcap.iter_batches(recs): ...
+
+Each KiteTicker callback batch shares one `seq`; iter_batches rebuilds the tick
+dicts _process_ticks reads (token, last_price, last_quantity, volume_traded,
+exchange_timestamp).
+"""
+from __future__ import annotations
+import os, threading
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+MAGIC = b"TICKCAP1"
+HEADER_LEN = 16
+
+TICK_DTYPE = np.dtype([
+    ("recv_ms", "<i8"),        # local receive time
+    ("seq", "<u4"),            # callback batch number within the file
+    ("token", "<u4"),
+    ("last_price", "<f8"),
+    ("last_quantity", "<f8"),
+    ("volume", "<f8"),         # volume_traded (day cumulative)
+    ("exch_ms", "<i8"),        # exchange_timestamp, 0 when absent
+])
+
+
+def capture_path(directory: str, date: str, shard_id: int) -> str:
+    return os.path.join(directory, f"ticks-{date.replace('-', '')}-s{shard_id}.bin")
+
+
+class TickWriter:
+    """
+    Appends tick batches to a capture file. append() only queues a reference (safe
+    to call from the socket callback); flush() converts and writes on the caller's
+    thread.
+    """
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._pending: List[Tuple[int, list]] = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.records = 0
+        fresh = not os.path.exists(path) or os.path.getsize(path) < HEADER_LEN
+        if not fresh:
+            recs = open_capture(path)
+            if len(recs):
+                self._seq = int(recs["seq"][-1]) + 1  # continue numbering after a restart
+        self._fh = open(path, "ab")
+        if fresh:
+            self._fh.write(MAGIC.ljust(HEADER_LEN, b"\0"))
+            self._fh.flush()
+
+    def append(self, recv_ms: int, ticks: list):
+        with self._lock:
+            self._pending.append((recv_ms, ticks))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        rows = []
+        for recv_ms, ticks in pending:
+            seq = self._seq
+            self._seq += 1
+            for tk in ticks:
+                token, lp = tk.get("instrument_token"), tk.get("last_price")
+                if not token or lp is None:
+                    continue
+                ets = tk.get("exchange_timestamp")
+                rows.append((
+                    recv_ms, seq, token, lp, tk.get("last_quantity") or 0,
+                    tk.get("volume_traded") or 0,
+                    int(ets.timestamp() * 1000) if isinstance(ets, datetime) else 0,
+                ))
+        if rows:
+            self._fh.write(np.array(rows, dtype=TICK_DTYPE).tobytes())
+            self._fh.flush()
+            self.records += len(rows)
+
+    def close(self):
+        self.flush()
+        self._fh.close()
+
+
+def open_capture(path: str) -> np.ndarray:
+    """Memory-map a capture file's records (read-only)."""
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a tick capture file")
+    n = (os.path.getsize(path) - HEADER_LEN) // TICK_DTYPE.itemsize
+    if n <= 0:
+        return np.zeros(0, dtype=TICK_DTYPE)
+    return np.memmap(path, dtype=TICK_DTYPE, mode="r", offset=HEADER_LEN, shape=(n,))
+
+
+def iter_batches(recs: np.ndarray) -> Iterator[Tuple[int, List[dict]]]:
+    """Yield (recv_ms, ticks) per captured callback batch, in file order."""
+    if not len(recs):
+        return
+    seq = np.asarray(recs["seq"])
+    bounds = np.flatnonzero(seq[1:] != seq[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(recs)]))
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        chunk = recs[a:b]
+        ticks = []
+        for token, lp, qty, vol, ems in zip(chunk["token"].tolist(), chunk["last_price"].tolist(),
+                                            chunk["last_quantity"].tolist(), chunk["volume"].tolist(),
+                                            chunk["exch_ms"].tolist()):
+            tk = {"instrument_token": token, "last_price": lp, "last_quantity": qty, "volume_traded": vol}
+            if ems:
+                tk["exchange_timestamp"] = datetime.fromtimestamp(ems / 1000)
+            ticks.append(tk)
+        yield int(chunk["recv_ms"][0]), ticks
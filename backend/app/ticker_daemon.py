@@ -1,26 +1,43 @@
 from __future__ import annotations
-import os, sys, time, json, math, signal, threading
+import os, sys, time, json, signal, threading, zlib, queue
+import multiprocessing as mp
 from collections import defaultdict, deque
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import datetime as dt
 
+import numpy as np
+
 from kiteconnect import KiteTicker, KiteConnect
 from kiteconnect.exceptions import NetworkException, TokenException
+from twisted.internet import reactor  # KiteTicker's reactor
+from twisted.python import threadable
 
 from .rl import redis_client
 from .kite import get_kite
 from .hist import record_minute_bar
+from . import snapstore, streams, tickcap, metrics, engine_v2, instruments
 
 # ---------- Config ----------
 IST = ZoneInfo("Asia/Kolkata")
 EXCHANGES = [x.strip() for x in os.getenv("EXCHANGES", "NSE,BSE").split(",") if x.strip()]
+# Dual-listed equities: keep one listing per ISIN (tradingsymbol when the dump has no ISIN),
+# choosing the earliest exchange in LISTING_PREFERENCE; the others become inst:alias entries.
+DEDUP_LISTINGS = os.getenv("DEDUP_LISTINGS", "1") == "1"
+LISTING_PREFERENCE = [x.strip() for x in os.getenv("LISTING_PREFERENCE", "NSE,BSE").split(",") if x.strip()]
 UNIVERSE_DEFAULT = int(os.getenv("UNIVERSE_LIMIT", "200"))
 ROTATE_INTERVAL_SEC = int(os.getenv("SUB_ROTATE_INTERVAL_SEC", "120"))
-ROTATE_BATCH = int(os.getenv("SUB_ROTATE_BATCH", "25"))  # reserved for future batch swap
+ROTATE_BATCH = int(os.getenv("SUB_ROTATE_BATCH", "25"))  # tokens per subscribe call
 RANK_WINDOW_MIN = int(os.getenv("RANK_WINDOW_MIN", "10"))
+# Universe probing: kite.quote in chunks (LTP carries no volume) ranks non-active symbols
+ROTATE_PROBE = os.getenv("SUB_ROTATE_PROBE", "1") == "1"
+ROTATE_PROBE_CHUNK = int(os.getenv("SUB_ROTATE_PROBE_CHUNK", "500"))   # kite.quote accepts 500 instruments
+QUOTE_RATE_PER_SEC = float(os.getenv("QUOTE_RATE_PER_SEC", "1"))  # Kite quote API, split across shards
+ROTATE_MAX_SWAPS = int(os.getenv("SUB_ROTATE_MAX_SWAPS", os.getenv("SUB_ROTATE_BATCH", "25")))
+ROTATE_HYSTERESIS = float(os.getenv("SUB_ROTATE_HYSTERESIS", "0.25"))  # challenger must beat incumbent by 25%
 BARS_CAP = int(os.getenv("BARS_CAP", "480"))  # ~ full day minutes
 VWAP_ROLL_MIN = int(os.getenv("VWAP_ROLL_MIN", "60"))
 VOL_BASELINE_MIN = int(os.getenv("VOL_BASELINE_MIN", "20"))
@@ -32,17 +49,47 @@ RSI_LEN = int(os.getenv("RSI_LEN", "14"))
 EMA_FAST = int(os.getenv("EMA_FAST", "9"))
 EMA_SLOW = int(os.getenv("EMA_SLOW", "21"))
 ORB_WINDOW_MIN = int(os.getenv("ORB_WINDOW_MIN", "30"))
+# Higher-timeframe rollups (minutes), aligned to MARKET_OPEN; snapshot fields tf5/tf15/tf60
+ROLLUP_TFS = tuple(int(x) for x in os.getenv("ROLLUP_TFS", "5,15,60").split(",") if x.strip())
 HIST_BACKFILL_MIN = int(os.getenv("HIST_BACKFILL_MIN", "120"))
 HIST_INTERVAL = os.getenv("HIST_INTERVAL", "minute")
+HIST_RATE_PER_SEC = float(os.getenv("HIST_RATE_PER_SEC", "3"))  # Kite historical API: 3 req/s, split across shards
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "3"))
+BACKFILL_RETRIES = int(os.getenv("BACKFILL_RETRIES", "2"))
+BACKFILL_READ_CHUNK = int(os.getenv("BACKFILL_READ_CHUNK", "200"))  # tokens per archive-read pipeline
+SNAP_FLUSH_MS = int(os.getenv("SNAP_FLUSH_MS", "250"))  # write-behind flush interval for snap:*
+SNAP_TTL_S = int(os.getenv("SNAP_TTL_S", "120"))
+MINUTE_CLOSE_GRACE_MS = int(os.getenv("MINUTE_CLOSE_GRACE_MS", "1500"))  # late-tick window after each minute
+MINUTE_CLOSE_MULTI = os.getenv("MINUTE_CLOSE_MULTI", "0") == "1"  # wrap minute finalization in MULTI/EXEC
+TICK_QUEUE_MAX = int(os.getenv("TICK_QUEUE_MAX", "2000"))  # tick batches buffered between socket and worker
+TICK_BACKPRESSURE = os.getenv("TICK_BACKPRESSURE", "coalesce").strip().lower()  # coalesce | drop_oldest
+CKPT_DIR = os.getenv("CKPT_DIR", os.path.join(os.path.dirname(__file__), "data", "ckpt"))
+CKPT_EVERY_MIN = int(os.getenv("CKPT_EVERY_MIN", "5"))  # indicator checkpoint cadence in minute closes; 0 = off
+LEADERBOARD = os.getenv("LEADERBOARD", "1") == "1"  # score at minute close into lb:{policy rev}
+METRICS_PUBLISH_SEC = float(os.getenv("METRICS_PUBLISH_SEC", "5"))  # metrics:ticker:{shard} refresh
+TICK_CAPTURE_DIR = os.getenv("TICK_CAPTURE_DIR", "").strip()  # set to record raw ticks for tick_replay
 
 MARKET_OPEN  = os.getenv("MARKET_OPEN",  "09:15")
 MARKET_CLOSE = os.getenv("MARKET_CLOSE", "15:30")
 
-# WebSocket mode: LTP | QUOTE | FULL (default QUOTE for stability)
+# Sharding: N connections/processes, each owning a deterministic slice of active tokens.
+# TICKER_SHARD_ID unset + TICKER_SHARDS>1 => run() supervises one child process per shard.
+TICKER_SHARDS = max(1, int(os.getenv("TICKER_SHARDS", "1")))
+TICKER_SHARD_ID = os.getenv("TICKER_SHARD_ID")
+
+# WebSocket mode: LTP | QUOTE | FULL | TIERED (default QUOTE for stability)
 TICKER_WS_MODE = os.getenv("TICKER_WS_MODE", "QUOTE").strip().upper()
+# TIERED: base universe streams in TIER_BASE_MODE; cfg:pinned, cfg:watchlist and the
+# TIER_TOP_N best plan:top symbols are upgraded, re-evaluated every TIER_REFRESH_SEC.
+TIER_BASE_MODE = os.getenv("TIER_BASE_MODE", "LTP").strip().upper()
+TIER_PINNED_MODE = os.getenv("TIER_PINNED_MODE", "FULL").strip().upper()
+TIER_WATCH_MODE = os.getenv("TIER_WATCH_MODE", "QUOTE").strip().upper()
+TIER_TOP_MODE = os.getenv("TIER_TOP_MODE", "QUOTE").strip().upper()
+TIER_TOP_N = int(os.getenv("TIER_TOP_N", "20"))
+TIER_REFRESH_SEC = int(os.getenv("TIER_REFRESH_SEC", "30"))
 
 # ---------- Data classes ----------
-@dataclass
+@dataclass(slots=True)
 class Bar:
     t: int       # epoch seconds (minute start)
     o: float
@@ -58,6 +105,54 @@ def now_s() -> int: return int(time.time())
 def now_ms() -> int: return int(time.time() * 1000)
 def ist_now() -> datetime: return datetime.now(tz=IST)
 
+def bar_doc(bar: Bar) -> Dict[str, Any]:
+    """Archive shape for bars:{sym}:{date}, stamped at the IST minute open."""
+    ist_dt = dt.datetime.fromtimestamp(bar.t, IST).replace(second=0, microsecond=0)
+    return {
+        "ts": ist_dt.isoformat(),  # "YYYY-MM-DDTHH:MM:00+05:30"
+        "o": float(bar.o), "h": float(bar.h),
+        "l": float(bar.l), "c": float(bar.c),
+        "v": int(bar.v),
+    }
+
+def save_state(path: str, state: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """Write an indicator checkpoint atomically (np.savez, uncompressed for speed)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, _meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **state)
+    os.replace(tmp, path)
+
+def load_state(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    with np.load(path) as z:
+        arrays = {k: z[k] for k in z.files}
+    meta = json.loads(arrays.pop("_meta").tobytes().decode())
+    return arrays, meta
+
+def bar_from_doc(doc: Dict[str, Any]) -> Bar:
+    """Inverse of bar_doc; the archive keeps no VWAP sums, so close*volume stands in."""
+    c, v = float(doc["c"]), float(doc["v"])
+    return Bar(
+        t=int(datetime.fromisoformat(doc["ts"]).timestamp()),
+        o=float(doc["o"]), h=float(doc["h"]), l=float(doc["l"]), c=c, v=v,
+        vwap_num=c * v, vwap_den=v,
+    )
+
+def book_top(depth: Any) -> Optional[Tuple[float, float, float, float]]:
+    """(bid, ask, spread_bps, imbalance) from a FULL-mode depth dict; imbalance in [-1, 1] over all levels."""
+    if not isinstance(depth, dict):
+        return None
+    buy, sell = depth.get("buy") or [], depth.get("sell") or []
+    if not buy or not sell:
+        return None
+    bid, ask = float(buy[0].get("price") or 0), float(sell[0].get("price") or 0)
+    if bid <= 0 or ask <= 0 or ask < bid:
+        return None
+    bq = sum(float(x.get("quantity") or 0) for x in buy)
+    sq = sum(float(x.get("quantity") or 0) for x in sell)
+    imb = (bq - sq) / (bq + sq) if bq + sq > 0 else 0.0
+    return bid, ask, (ask - bid) / ((ask + bid) / 2) * 10000.0, imb
+
 def parse_time_hhmm(s: str) -> Tuple[int, int]:
     hh, mm = s.strip().split(":")
     return int(hh), int(mm)
@@ -72,140 +167,495 @@ def is_market_open(ts: Optional[datetime] = None) -> bool:
     end = d.replace(hour=ch, minute=cm, second=0, microsecond=0)
     return start <= d <= end
 
+class RateLimiter:
+    """Spaces calls to at most `rate` per second across threads."""
+    def __init__(self, rate: float):
+        self.interval = (1.0 / rate) if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+# ---------- Tick queue ----------
+def _coalesce_ticks(older: List[dict], newer: List[dict]) -> List[dict]:
+    """
+    Merge two tick batches into one: the latest tick per token wins, while the
+    traded quantity, price*qty and high/low/open seen in between are carried in
+    _-prefixed keys so the minute bar still sees them.
+    """
+    merged: Dict[int, dict] = {}
+    for tk in list(older) + list(newer):
+        tok = tk.get("instrument_token")
+        lp = tk.get("last_price")
+        if not tok or lp is None:
+            continue
+        qty = float(tk.get("last_quantity") or 0)
+        hi = tk.get("_hi", lp)
+        lo = tk.get("_lo", lp)
+        pv = tk.get("_pv", float(lp) * qty)
+        prev = merged.get(tok)
+        m = dict(tk)
+        if prev is None:
+            m["_o"] = tk.get("_o", lp)
+        else:
+            m["_o"] = prev["_o"]
+            hi = max(prev["_hi"], hi)
+            lo = min(prev["_lo"], lo)
+            qty += prev["last_quantity"]
+            pv += prev["_pv"]
+        m["_hi"], m["_lo"], m["_pv"], m["last_quantity"] = hi, lo, pv, qty
+        merged[tok] = m
+    return list(merged.values())
+
+class TickQueue:
+    """
+    Bounded FIFO of (recv_ms, ticks) batches between the KiteTicker callback and
+    the ingest worker. When full, TICK_BACKPRESSURE decides what gives:
+      coalesce    - merge the two oldest batches (no price/volume is lost, only granularity)
+      drop_oldest - discard the oldest batch
+    """
+    def __init__(self, maxsize: int, policy: str):
+        self.maxsize = max(2, maxsize)
+        self.policy = policy if policy in ("coalesce", "drop_oldest") else "coalesce"
+        self._q: deque = deque()
+        self._cv = threading.Condition()
+        self.dropped = 0     # ticks discarded
+        self.coalesced = 0   # ticks folded into another tick
+        self.high_water = 0
+
+    def put(self, recv_ms: int, ticks: List[dict]):
+        with self._cv:
+            if len(self._q) >= self.maxsize:
+                if self.policy == "coalesce":
+                    a_ms, a = self._q.popleft()
+                    _, b = self._q.popleft()
+                    merged = _coalesce_ticks(a, b)
+                    self.coalesced += len(a) + len(b) - len(merged)
+                    self._q.appendleft((a_ms, merged))
+                else:
+                    _, a = self._q.popleft()
+                    self.dropped += len(a)
+            self._q.append((recv_ms, ticks))
+            self.high_water = max(self.high_water, len(self._q))
+            self._cv.notify()
+
+    def get(self, timeout: float) -> Optional[Tuple[int, List[dict]]]:
+        with self._cv:
+            if not self._q:
+                self._cv.wait(timeout)
+            return self._q.popleft() if self._q else None
+
+    def __len__(self) -> int:
+        return len(self._q)
+
 # ---------- Indicator helpers ----------
+INDICATOR_RESYNC_BARS = 1024  # re-sum ring buffers every N bars per token to shed float drift
+
 class MinuteIndicators:
-    """Rolling, per-token minute indicators."""
-    def __init__(self):
-        self.min_bars: Dict[int, deque] = defaultdict(lambda: deque(maxlen=BARS_CAP))
-        self.close_hist: Dict[int, deque] = defaultdict(lambda: deque(maxlen=max(BB_LEN, RSI_LEN, EMA_SLOW, ATR_LEN, DONCHIAN_LEN)))
-        self.tr_hist: Dict[int, deque] = defaultdict(lambda: deque(maxlen=ATR_LEN))
-        self.vwap_roll: Dict[int, deque] = defaultdict(lambda: deque(maxlen=VWAP_ROLL_MIN))  # (num, den)
-        self.vol_hist: Dict[int, deque] = defaultdict(lambda: deque(maxlen=VOL_BASELINE_MIN))
-        self.ema_fast: Dict[int, float] = {}
-        self.ema_slow: Dict[int, float] = {}
-        self.avg_gain: Dict[int, float] = {}
-        self.avg_loss: Dict[int, float] = {}
-        self.orb_hi: Dict[int, float] = {}
-        self.orb_lo: Dict[int, float] = {}
+    """
+    Rolling, per-token minute indicators in struct-of-arrays form.
+
+    Each token owns a dense slot; last-bar fields, EMA/RSI/ORB state and the
+    VWAP/BB/ATR/VolX/Donchian windows live in NumPy arrays (ring buffers plus
+    running sums), so a minute close for the whole universe is one vectorized
+    pass and per-token state costs no Python objects.
+    """
+    def __init__(self, capacity: int = 256):
+        self.slots: Dict[int, int] = {}
         self.open_minute: Optional[int] = None
+        self._cap = 0
+        self._grow(max(1, capacity))
+
+    # --- storage ---
+    @staticmethod
+    def _specs() -> List[Tuple[str, Tuple[int, ...], Any, float]]:
+        nan, inf = float("nan"), float("inf")
+        rollups = []
+        for tf in ROLLUP_TFS:
+            p = f"tf{tf}_"
+            rollups += [
+                # forming bucket
+                (p + "bucket", (), np.int64, -1), (p + "pn", (), np.int64, 0),
+                (p + "po", (), np.float64, nan), (p + "ph", (), np.float64, nan),
+                (p + "pl", (), np.float64, nan), (p + "pc", (), np.float64, nan),
+                (p + "pv", (), np.float64, 0.0),
+                # completed buckets
+                (p + "n", (), np.int64, 0), (p + "t", (), np.int64, 0),
+                (p + "o", (), np.float64, nan), (p + "h", (), np.float64, nan),
+                (p + "l", (), np.float64, nan), (p + "c", (), np.float64, nan),
+                (p + "v", (), np.float64, 0.0),
+                (p + "ema_fast", (), np.float64, nan), (p + "ema_slow", (), np.float64, nan),
+                (p + "avg_gain", (), np.float64, nan), (p + "avg_loss", (), np.float64, nan),
+                (p + "tr_ring", (ATR_LEN,), np.float64, 0.0),
+            ]
+        return rollups + [
+            ("n", (), np.int64, 0),
+            ("last_t", (), np.int64, 0),
+            ("last_c", (), np.float64, nan), ("last_v", (), np.float64, 0.0),
+            ("ema_fast", (), np.float64, nan), ("ema_slow", (), np.float64, nan),
+            ("avg_gain", (), np.float64, nan), ("avg_loss", (), np.float64, nan),
+            ("orb_hi", (), np.float64, nan), ("orb_lo", (), np.float64, nan),
+            ("bb_ring", (BB_LEN,), np.float64, 0.0),
+            ("bb_sum", (), np.float64, 0.0), ("bb_sq", (), np.float64, 0.0),
+            ("tr_ring", (ATR_LEN,), np.float64, 0.0), ("tr_sum", (), np.float64, 0.0),
+            ("vn_ring", (VWAP_ROLL_MIN,), np.float64, 0.0), ("vn_sum", (), np.float64, 0.0),
+            ("vd_ring", (VWAP_ROLL_MIN,), np.float64, 0.0), ("vd_sum", (), np.float64, 0.0),
+            ("vol_ring", (VOL_BASELINE_MIN,), np.float64, 0.0), ("vol_sum", (), np.float64, 0.0),
+            ("book_bid", (), np.float64, nan), ("book_ask", (), np.float64, nan),
+            ("book_spread_bps", (), np.float64, nan), ("book_imb", (), np.float64, nan),
+            ("dhi_ring", (DONCHIAN_LEN,), np.float64, -inf),
+            ("dlo_ring", (DONCHIAN_LEN,), np.float64, inf),
+        ]
+
+    def _grow(self, cap: int):
+        for name, tail, dtype, fill in self._specs():
+            arr = np.full((cap,) + tail, fill, dtype=dtype)
+            if self._cap:
+                arr[:self._cap] = getattr(self, name)
+            setattr(self, name, arr)
+        self._cap = cap
+
+    def slot(self, token: int) -> int:
+        s = self.slots.get(token)
+        if s is None:
+            s = len(self.slots)
+            if s >= self._cap:
+                self._grow(self._cap * 2)
+            self.slots[token] = s
+        return s
+
+    def __contains__(self, token: int) -> bool:
+        s = self.slots.get(token)
+        return s is not None and self.n[s] > 0
+
+    def last_time(self, token: int) -> int:
+        """Epoch seconds of the newest bar folded for token (0 if none)."""
+        s = self.slots.get(token)
+        return int(self.last_t[s]) if s is not None and self.n[s] > 0 else 0
+
+    # --- checkpoint ---
+    def state(self) -> Dict[str, np.ndarray]:
+        """Copy of the used slots' arrays plus the token order, for save_state()."""
+        n = len(self.slots)
+        out = {name: getattr(self, name)[:n].copy() for name, *_ in self._specs()}
+        out["_tokens"] = np.array(sorted(self.slots, key=self.slots.get), dtype=np.int64)
+        out["_open_minute"] = np.array([-1 if self.open_minute is None else self.open_minute], dtype=np.int64)
+        return out
+
+    @classmethod
+    def from_state(cls, z) -> "MinuteIndicators":
+        """Rebuild from state() arrays; raises ValueError if the layout (windows, timeframes) changed."""
+        tokens = np.asarray(z["_tokens"])
+        ind = cls(capacity=max(256, len(tokens)))
+        for name, tail, _, _ in cls._specs():
+            if name not in z or tuple(z[name].shape) != (len(tokens),) + tail:
+                raise ValueError(f"checkpoint field {name} missing or resized")
+            getattr(ind, name)[:len(tokens)] = z[name]
+        ind.slots = {int(t): i for i, t in enumerate(tokens.tolist())}
+        om = int(np.asarray(z["_open_minute"])[0])
+        ind.open_minute = None if om < 0 else om
+        return ind
+
+    def reset(self, token: int):
+        """Forget a token's state (keeps its slot) so a later re-seed starts clean."""
+        s = self.slots.get(token)
+        if s is None:
+            return
+        for name, _, _, fill in self._specs():
+            getattr(self, name)[s] = fill
 
+    # --- updates ---
     def on_minute_close(self, token: int, bar: Bar):
-        self.min_bars[token].append(bar)
-        self.close_hist[token].append(bar.c)
-
-        prev = self.min_bars[token][-2] if len(self.min_bars[token]) >= 2 else None
-        pc  = prev.c if prev else bar.c
-        tr  = max(bar.h - bar.l, abs(bar.h - pc), abs(bar.l - pc))
-        self.tr_hist[token].append(tr)
-
-        self.vwap_roll[token].append((bar.vwap_num, bar.vwap_den))
-        self.vol_hist[token].append(bar.v)
+        self.close_many([token], [bar])
 
-        minute_index = int(bar.t // 60)
+    def close_many(self, tokens: List[int], bars: List[Bar]):
+        """Fold one finalized bar per token (tokens must be unique) in a single vectorized pass."""
+        if not tokens:
+            return
+        idx = np.fromiter((self.slot(t) for t in tokens), dtype=np.int64, count=len(tokens))
+        t = np.fromiter((b.t for b in bars), dtype=np.int64, count=len(bars))
+        o = np.fromiter((b.o for b in bars), dtype=np.float64, count=len(bars))
+        h = np.fromiter((b.h for b in bars), dtype=np.float64, count=len(bars))
+        l = np.fromiter((b.l for b in bars), dtype=np.float64, count=len(bars))
+        c = np.fromiter((b.c for b in bars), dtype=np.float64, count=len(bars))
+        v = np.fromiter((b.v for b in bars), dtype=np.float64, count=len(bars))
+        vn = np.fromiter((b.vwap_num for b in bars), dtype=np.float64, count=len(bars))
+        vd = np.fromiter((b.vwap_den for b in bars), dtype=np.float64, count=len(bars))
+
+        n = self.n[idx]
+        has_prev = n > 0
+        pc = np.where(has_prev, self.last_c[idx], c)
+        tr = np.maximum(h - l, np.maximum(np.abs(h - pc), np.abs(l - pc)))
+
+        def push(ring: str, total: Optional[str], x, sq: Optional[str] = None):
+            buf = getattr(self, ring)
+            pos = n % buf.shape[1]
+            old = buf[idx, pos]
+            buf[idx, pos] = x
+            if total:
+                getattr(self, total)[idx] += x - old
+            if sq:
+                getattr(self, sq)[idx] += x * x - old * old
+
+        push("bb_ring", "bb_sum", c, sq="bb_sq")
+        push("tr_ring", "tr_sum", tr)
+        push("vn_ring", "vn_sum", vn)
+        push("vd_ring", "vd_sum", vd)
+        push("vol_ring", "vol_sum", v)
+        push("dhi_ring", None, h)
+        push("dlo_ring", None, l)
+
+        minute_index = t // 60
         if self.open_minute is None:
-            self.open_minute = minute_index
-        if (minute_index - self.open_minute) < ORB_WINDOW_MIN:
-            self.orb_hi[token] = max(self.orb_hi.get(token, bar.h), bar.h)
-            self.orb_lo[token] = min(self.orb_lo.get(token, bar.l), bar.l)
+            self.open_minute = int(minute_index[0])
+        in_orb = (minute_index - self.open_minute) < ORB_WINDOW_MIN
+        self.orb_hi[idx] = np.where(in_orb, np.fmax(self.orb_hi[idx], h), self.orb_hi[idx])
+        self.orb_lo[idx] = np.where(in_orb, np.fmin(self.orb_lo[idx], l), self.orb_lo[idx])
 
-        for ln, store in ((EMA_FAST, self.ema_fast), (EMA_SLOW, self.ema_slow)):
+        for ln, name in ((EMA_FAST, "ema_fast"), (EMA_SLOW, "ema_slow")):
+            store = getattr(self, name)
             k = 2 / (ln + 1)
-            prev_ema = store.get(token, bar.c)
-            store[token] = prev_ema + k * (bar.c - prev_ema)
-
-        if prev:
-            delta = bar.c - prev.c
-            gain = max(delta, 0.0)
-            loss = max(-delta, 0.0)
-            ag = self.avg_gain.get(token, gain)
-            al = self.avg_loss.get(token, loss)
-            ag = (ag * (RSI_LEN - 1) + gain) / RSI_LEN
-            al = (al * (RSI_LEN - 1) + loss) / RSI_LEN
-            self.avg_gain[token] = ag
-            self.avg_loss[token] = al
-
+            prev_ema = store[idx]
+            prev_ema = np.where(np.isnan(prev_ema), c, prev_ema)
+            store[idx] = prev_ema + k * (c - prev_ema)
+
+        delta = c - pc
+        gain = np.maximum(delta, 0.0)
+        loss = np.maximum(-delta, 0.0)
+        ag = self.avg_gain[idx]
+        al = self.avg_loss[idx]
+        ag = np.where(np.isnan(ag), gain, ag)
+        al = np.where(np.isnan(al), loss, al)
+        ag = (ag * (RSI_LEN - 1) + gain) / RSI_LEN
+        al = (al * (RSI_LEN - 1) + loss) / RSI_LEN
+        self.avg_gain[idx] = np.where(has_prev, ag, self.avg_gain[idx])
+        self.avg_loss[idx] = np.where(has_prev, al, self.avg_loss[idx])
+
+        self.last_t[idx] = t
+        self.last_c[idx] = c; self.last_v[idx] = v
+        self.n[idx] = n + 1
+
+        resync = idx[(n + 1) % INDICATOR_RESYNC_BARS == 0]
+        if resync.size:
+            self.bb_sum[resync] = self.bb_ring[resync].sum(axis=1)
+            self.bb_sq[resync] = (self.bb_ring[resync] ** 2).sum(axis=1)
+            self.tr_sum[resync] = self.tr_ring[resync].sum(axis=1)
+            self.vn_sum[resync] = self.vn_ring[resync].sum(axis=1)
+            self.vd_sum[resync] = self.vd_ring[resync].sum(axis=1)
+            self.vol_sum[resync] = self.vol_ring[resync].sum(axis=1)
+
+        if ROLLUP_TFS:
+            self._roll(idx, minute_index, o, h, l, c, v)
+
+    def set_book(self, tokens: List[int], books: List[Optional[List[float]]]):
+        """
+        Store each token's minute top-of-book aggregate ([n, spread_bps_sum, imbalance_sum,
+        last bid, last ask]) from FULL-mode depth; None clears it (no depth that minute).
+        """
+        if not tokens:
+            return
+        idx = np.fromiter((self.slot(t) for t in tokens), dtype=np.int64, count=len(tokens))
+        nan = float("nan")
+        rows = [(b[3], b[4], b[1] / b[0], b[2] / b[0]) if b and b[0] else (nan, nan, nan, nan) for b in books]
+        bid, ask, sp, imb = (np.array(col, dtype=np.float64) for col in zip(*rows))
+        self.book_bid[idx] = bid
+        self.book_ask[idx] = ask
+        self.book_spread_bps[idx] = sp
+        self.book_imb[idx] = imb
+
+    # --- higher timeframes ---
+    def _roll(self, idx, m, o, h, l, c, v):
+        """Merge 1-minute bars into each ROLLUP_TFS bucket; complete buckets on their last minute."""
+        oh, om = parse_time_hhmm(MARKET_OPEN)
+        day = (m + 330) // 1440                       # IST calendar day (UTC+05:30)
+        open_abs = day * 1440 - 330 + oh * 60 + om    # session open as an epoch minute index
+        for tf in ROLLUP_TFS:
+            p = f"tf{tf}_"
+            start = open_abs + ((m - open_abs) // tf) * tf
+            bucket, pn = getattr(self, p + "bucket"), getattr(self, p + "pn")
+            stale = (pn[idx] > 0) & (bucket[idx] != start)  # forming bucket never saw its last minute
+            if stale.any():
+                self._complete_tf(tf, idx[stale])
+            new = pn[idx] == 0
+            po, ph, pl, pc, pv = (getattr(self, p + k) for k in ("po", "ph", "pl", "pc", "pv"))
+            bucket[idx] = start
+            po[idx] = np.where(new, o, po[idx])
+            ph[idx] = np.where(new, h, np.fmax(ph[idx], h))
+            pl[idx] = np.where(new, l, np.fmin(pl[idx], l))
+            pc[idx] = c
+            pv[idx] = np.where(new, v, pv[idx] + v)
+            pn[idx] += 1
+            done = m == start + tf - 1
+            if done.any():
+                self._complete_tf(tf, idx[done])
+
+    def _complete_tf(self, tf: int, ix):
+        """Fold the forming bucket of slots ix into their tf indicators (same math as 1-minute)."""
+        p = f"tf{tf}_"
+        g = lambda k: getattr(self, p + k)
+        n = g("n")[ix]
+        o, h, l, c, v = g("po")[ix], g("ph")[ix], g("pl")[ix], g("pc")[ix], g("pv")[ix]
+        has_prev = n > 0
+        prev_c = np.where(has_prev, g("c")[ix], c)
+        g("tr_ring")[ix, n % ATR_LEN] = np.maximum(h - l, np.maximum(np.abs(h - prev_c), np.abs(l - prev_c)))
+        for ln, name in ((EMA_FAST, "ema_fast"), (EMA_SLOW, "ema_slow")):
+            prev = g(name)[ix]
+            prev = np.where(np.isnan(prev), c, prev)
+            g(name)[ix] = prev + 2 / (ln + 1) * (c - prev)
+        delta = c - prev_c
+        gain, loss = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+        ag, al = g("avg_gain")[ix], g("avg_loss")[ix]
+        ag = (np.where(np.isnan(ag), gain, ag) * (RSI_LEN - 1) + gain) / RSI_LEN
+        al = (np.where(np.isnan(al), loss, al) * (RSI_LEN - 1) + loss) / RSI_LEN
+        g("avg_gain")[ix] = np.where(has_prev, ag, g("avg_gain")[ix])
+        g("avg_loss")[ix] = np.where(has_prev, al, g("avg_loss")[ix])
+        g("t")[ix] = g("bucket")[ix] * 60
+        g("o")[ix] = o; g("h")[ix] = h; g("l")[ix] = l; g("c")[ix] = c; g("v")[ix] = v
+        g("n")[ix] = n + 1
+        g("pn")[ix] = 0
+
+    def _tf_docs(self, tf: int, idx) -> List[Optional[Dict[str, Any]]]:
+        p = f"tf{tf}_"
+        g = lambda k: getattr(self, p + k)[idx]
+        n = g("n")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            atr = np.where(n > 0, g("tr_ring").sum(axis=1) / np.maximum(1, np.minimum(n, ATR_LEN)), 0.0)
+            ag = np.nan_to_num(g("avg_gain"), nan=0.0)
+            al = np.where(np.isnan(g("avg_loss")), 1e-9, g("avg_loss"))
+            rsi = 100.0 - (100.0 / (1.0 + np.where(al > 0, ag / al, 0.0)))
+        c = g("c")
+        ema_f = np.where(np.isnan(g("ema_fast")), c, g("ema_fast"))
+        ema_s = np.where(np.isnan(g("ema_slow")), c, g("ema_slow"))
+        cols = [x.tolist() for x in (n, g("t"), g("o"), g("h"), g("l"), c, g("v"), ema_f, ema_s, rsi, atr)]
+        out: List[Optional[Dict[str, Any]]] = []
+        for n_, t_, o_, h_, l_, c_, v_, ef, es, rs_, at in zip(*cols):
+            if not n_:
+                out.append(None)
+                continue
+            out.append({
+                "t": t_, "bars": n_,
+                "o": round(o_, 2), "h": round(h_, 2), "l": round(l_, 2), "c": round(c_, 2), "v": round(v_, 2),
+                "ema9": round(ef, 2), "ema21": round(es, 2), "rsi14": round(rs_, 1), "atr": round(at, 2),
+                "trend": "up" if ef >= es else "down",
+            })
+        return out
+
+    # --- reads ---
     def snapshot(self, token: int) -> Dict[str, Any]:
-        bars = self.min_bars[token]
-        if not bars:
-            return {}
-        last = bars[-1]
-
-        # VWAP(60)
-        num = sum(n for n, d in self.vwap_roll[token])
-        den = sum(d for n, d in self.vwap_roll[token])
-        vwap60 = (num / den) if den > 0 else last.c
-        vwap_delta_pct = ((last.c - vwap60) / vwap60 * 100.0) if vwap60 else 0.0
-
-        # BB(20,2)
-        closes = list(self.close_hist[token])[-BB_LEN:]
-        bb_mid = sum(closes) / len(closes) if closes else last.c
-        variance = sum((x - bb_mid) ** 2 for x in closes) / len(closes) if closes else 0.0
-        bb_std = math.sqrt(variance)
-        bb_up = bb_mid + BB_STD * bb_std
-        bb_lo = bb_mid - BB_STD * bb_std
-
-        # ATR(14)
-        trs = list(self.tr_hist[token])
-        atr = (sum(trs) / len(trs)) if trs else 0.0
-
-        # Donchian(20)
-        recent = list(bars)[-DONCHIAN_LEN:]
-        d_hi = max(b.h for b in recent) if recent else last.h
-        d_lo = min(b.l for b in recent) if recent else last.l
-
-        # RSI
-        ag = self.avg_gain.get(token, 0.0)
-        al = self.avg_loss.get(token, 1e-9)
-        rs = (ag / al) if al > 0 else 0.0
-        rsi = 100.0 - (100.0 / (1.0 + rs))
-
-        # EMA
-        ema9 = self.ema_fast.get(token, last.c)
-        ema21 = self.ema_slow.get(token, last.c)
-
-        # ORB
-        orb_hi = self.orb_hi.get(token)
-        orb_lo = self.orb_lo.get(token)
-
-        # VolX baseline
-        vol_hist = self.vol_hist[token]
-        baseline = (sum(vol_hist) / len(vol_hist)) if vol_hist else 0.0
-        volx = (last.v / baseline) if baseline > 0 else 0.0
-
-        return {
-            "price": round(last.c, 2),
-            "last_price": round(last.c, 2),
-            "last_close": round(last.c, 2),
-            "vwap": round(vwap60, 2),
-            "vwap_delta_pct": round(vwap_delta_pct, 2),
-            "minute_vol_multiple": round(volx, 2),
-            "vol_mult": round(volx, 2),
-            "ema9": round(ema9, 2),
-            "ema21": round(ema21, 2),
-            "rsi14": round(rsi, 1),
-            "bb_middle": round(bb_mid, 2),
-            "bb_upper": round(bb_up, 2),
-            "bb_lower": round(bb_lo, 2),
-            "atr": round(atr, 2),
-            "atr14": round(atr, 2),
-            "donchian_hi": round(d_hi, 2),
-            "donchian_upper": round(d_hi, 2),
-            "donchian_lo": round(d_lo, 2),
-            "donchian_lower": round(d_lo, 2),
-            "orb_high": None if orb_hi is None else round(orb_hi, 2),
-            "orb_low":  None if orb_lo is None else round(orb_lo, 2),
-            "last_volume": round(last.v, 2),
-        }
+        return self.snapshot_many([token])[0]
+
+    def snapshot_many(self, tokens: List[int]) -> List[Dict[str, Any]]:
+        """Snapshot docs for tokens ({} for tokens with no closed bar), computed vectorized."""
+        if not tokens:
+            return []
+        idx = np.fromiter((self.slots.get(t, -1) for t in tokens), dtype=np.int64, count=len(tokens))
+        known = idx >= 0
+        idx = np.where(known, idx, 0)
+        n = np.where(known, self.n[idx], 0)
+        last_c, last_v = self.last_c[idx], self.last_v[idx]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # VWAP(60)
+            num, den = self.vn_sum[idx], self.vd_sum[idx]
+            vwap60 = np.where(den > 0, num / den, last_c)
+            vwap_delta_pct = np.where(vwap60 != 0, (last_c - vwap60) / vwap60 * 100.0, 0.0)
+
+            # BB(20,2)
+            bn = np.minimum(n, BB_LEN)
+            bb_mid = np.where(bn > 0, self.bb_sum[idx] / bn, last_c)
+            variance = np.where(bn > 0, np.maximum(0.0, self.bb_sq[idx] / bn - bb_mid * bb_mid), 0.0)
+            bb_std = np.sqrt(variance)
+            bb_up = bb_mid + BB_STD * bb_std
+            bb_lo = bb_mid - BB_STD * bb_std
+
+            # ATR(14)
+            tn = np.minimum(n, ATR_LEN)
+            atr = np.where(tn > 0, self.tr_sum[idx] / tn, 0.0)
+
+            # Donchian(20)
+            d_hi = self.dhi_ring[idx].max(axis=1)
+            d_lo = self.dlo_ring[idx].min(axis=1)
+
+            # RSI
+            ag = np.nan_to_num(self.avg_gain[idx], nan=0.0)
+            al = np.where(np.isnan(self.avg_loss[idx]), 1e-9, self.avg_loss[idx])
+            rs = np.where(al > 0, ag / al, 0.0)
+            rsi = 100.0 - (100.0 / (1.0 + rs))
+
+            # EMA
+            ema9 = np.where(np.isnan(self.ema_fast[idx]), last_c, self.ema_fast[idx])
+            ema21 = np.where(np.isnan(self.ema_slow[idx]), last_c, self.ema_slow[idx])
+
+            # VolX baseline
+            vn_ = np.minimum(n, VOL_BASELINE_MIN)
+            baseline = np.where(vn_ > 0, self.vol_sum[idx] / vn_, 0.0)
+            volx = np.where(baseline > 0, last_v / baseline, 0.0)
+
+        cols = [x.tolist() for x in (
+            last_c, vwap60, vwap_delta_pct, volx, ema9, ema21, rsi, bb_mid, bb_up, bb_lo,
+            atr, d_hi, d_lo, self.orb_hi[idx], self.orb_lo[idx], last_v,
+            self.book_bid[idx], self.book_ask[idx], self.book_spread_bps[idx], self.book_imb[idx],
+        )]
+        out: List[Dict[str, Any]] = []
+        for i, (c, vw, vwd, vx, e9, e21, rs_, bm, bu, bl, at, dh, dl, oh, ol, lv,
+                bb_, ba_, sp, im) in enumerate(zip(*cols)):
+            if not n[i]:
+                out.append({})
+                continue
+            out.append({
+                "price": round(c, 2),
+                "last_price": round(c, 2),
+                "last_close": round(c, 2),
+                "vwap": round(vw, 2),
+                "vwap_delta_pct": round(vwd, 2),
+                "minute_vol_multiple": round(vx, 2),
+                "vol_mult": round(vx, 2),
+                "ema9": round(e9, 2),
+                "ema21": round(e21, 2),
+                "rsi14": round(rs_, 1),
+                "bb_middle": round(bm, 2),
+                "bb_upper": round(bu, 2),
+                "bb_lower": round(bl, 2),
+                "atr": round(at, 2),
+                "atr14": round(at, 2),
+                "donchian_hi": round(dh, 2),
+                "donchian_upper": round(dh, 2),
+                "donchian_lo": round(dl, 2),
+                "donchian_lower": round(dl, 2),
+                "orb_high": None if oh != oh else round(oh, 2),
+                "orb_low":  None if ol != ol else round(ol, 2),
+                "last_volume": round(lv, 2),
+                # Minute top-of-book from FULL-mode depth (None without depth)
+                "bid": None if bb_ != bb_ else round(bb_, 2),
+                "ask": None if ba_ != ba_ else round(ba_, 2),
+                "spread_bps": None if sp != sp else round(sp, 2),
+                "spread_pct": None if sp != sp else round(sp / 100.0, 4),
+                "depth_imbalance": None if im != im else round(im, 3),
+            })
+        for tf in ROLLUP_TFS:
+            for doc, tdoc in zip(out, self._tf_docs(tf, idx)):
+                if doc:
+                    doc[f"tf{tf}"] = tdoc
+        return out
 
 # ---------- Universe & tokens ----------
-def load_instruments(kite: KiteConnect) -> Tuple[Dict[int, str], Dict[str, int]]:
+def load_instruments(kite: KiteConnect, r=None) -> Tuple[Dict[int, str], Dict[str, int], Dict[str, str]]:
     """
-    Build maps for NSE/BSE equities.
+    Build maps for NSE/BSE equities from the day's cached instrument master.
     Accept: exchange in EXCHANGES AND instrument_type == 'EQ' AND segment != 'INDICES'
     Token: instrument_token (or instrumenttoken)
+    Returns (token2sym, sym2token, alias); with DEDUP_LISTINGS the maps hold one
+    listing per company and alias maps every other listing to it.
     """
     token2sym: Dict[int, str] = {}
     sym2token: Dict[str, int] = {}
+    listing: Dict[str, str] = {}  # sym -> ISIN (or bare tradingsymbol)
 
     def norm_exchange(inst: dict) -> Optional[str]:
         ex = inst.get("exchange")
@@ -243,41 +693,65 @@ def load_instruments(kite: KiteConnect) -> Tuple[Dict[int, str], Dict[str, int]]
         sym = f"{expected_exch}:{tsym}"
         token2sym[tok] = sym
         sym2token[sym]  = tok
+        # ISIN identifies the security; without one, a bare tradingsymbol can name
+        # unrelated companies on NSE and BSE, so the issuer name must match too.
+        name = str(inst.get("name") or "").strip().upper()
+        key = inst.get("isin") or (f"{tsym}|{name}" if name else None)
+        if key:
+            listing[sym] = key
 
     # 1) Exchange-specific (preferred)
     for exch in EXCHANGES:
-        try:
-            rows = kite.instruments(exch)
-        except Exception:
-            rows = []
-        for inst in rows or []:
+        for inst in instruments.get(kite, exch, r):
             maybe_add(inst, exch)
 
     # 2) Fallback to all-instruments if still empty
     if not token2sym:
-        try:
-            rows = kite.instruments()
-        except Exception:
-            rows = []
-        for inst in rows or []:
+        for inst in instruments.get(kite, None, r):
             ex = norm_exchange(inst)
             if ex in EXCHANGES:
                 maybe_add(inst, ex or "")
 
+    alias = dedupe_listings(sym2token, listing) if DEDUP_LISTINGS else {}
+    for sym in alias:
+        token2sym.pop(sym2token.pop(sym), None)
+
     # Log counts for diagnostics
-    print(f"[ticker] instruments loaded: {len(token2sym)} across {EXCHANGES}", file=sys.stderr)
+    print(f"[ticker] instruments loaded: {len(token2sym)} across {EXCHANGES} ({len(alias)} duplicate listings aliased)", file=sys.stderr)
     if token2sym:
         any_tok = next(iter(token2sym))
         print(f"[ticker] sample: {any_tok} -> {token2sym[any_tok]}", file=sys.stderr)
 
-    return token2sym, sym2token
-
-def compute_active(sym2token: Dict[str, int], r, limit: int) -> List[int]:
+    return token2sym, sym2token, alias
+
+def dedupe_listings(sym2token: Dict[str, int], listing: Dict[str, str]) -> Dict[str, str]:
+    """Alias map {secondary sym: primary sym} for listings sharing an ISIN, or tradingsymbol and name."""
+    rank = {ex: i for i, ex in enumerate(LISTING_PREFERENCE)}
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for sym in sym2token:
+        groups[listing.get(sym) or sym].append(sym)
+    alias: Dict[str, str] = {}
+    for syms in groups.values():
+        if len(syms) < 2:
+            continue
+        syms.sort(key=lambda s: (rank.get(s.split(":", 1)[0], len(rank)), s))
+        for s in syms[1:]:
+            alias[s] = syms[0]
+    return alias
+
+def shard_of(token: int, shards: int) -> int:
+    """Stable token -> shard mapping (crc32, so it is identical across processes)."""
+    if shards <= 1:
+        return 0
+    return zlib.crc32(str(int(token)).encode()) % shards
+
+def compute_active(sym2token: Dict[str, int], r, limit: int, alias: Optional[Dict[str, str]] = None) -> List[int]:
+    alias = alias or {}
     pinned = sorted(list(r.smembers("cfg:pinned") or []))
     limit = int(r.get("cfg:universe_limit") or limit)
     active: List[int] = []
     for s in pinned:
-        t = sym2token.get(s)
+        t = sym2token.get(alias.get(s, s))
         if t and t not in active:
             active.append(t)
     if len(active) < limit:
@@ -290,250 +764,986 @@ def compute_active(sym2token: Dict[str, int], r, limit: int) -> List[int]:
 
 # ---------- Ticker Daemon ----------
 class TickerDaemon:
-    def __init__(self):
+    def __init__(self, shard_id: int = 0, shards: int = 1, offline: bool = False):
+        """
+        offline=True builds a daemon without a Kite session or socket (tick replay):
+        instrument maps come from the inst:* hashes a live run left in Redis and
+        nothing registers the shard or touches symbols:active.
+        """
+        self.shard_id = int(shard_id)
+        self.shards = max(1, int(shards))
+        self.offline = offline
         self.r = redis_client(os.getenv("REDIS_URL", "redis://redis:6379/0"))
-        self.ks = get_kite()
-        if not self.ks.access_token:
-            raise RuntimeError("Kite session not ready. Login first.")
-        self.kite = self.ks.kite
-
-        self.token2sym, self.sym2token = load_instruments(self.kite)
+        if offline:
+            self.ks = self.kite = None
+            self.token2sym = {int(k): v for k, v in (self.r.hgetall("inst:token2sym") or {}).items()}
+            self.sym2token = {v: k for k, v in self.token2sym.items()}
+            self.alias = self.r.hgetall("inst:alias") or {}
+        else:
+            self.ks = get_kite()
+            if not self.ks.access_token:
+                raise RuntimeError("Kite session not ready. Login first.")
+            self.kite = self.ks.kite
+            self.token2sym, self.sym2token, self.alias = load_instruments(self.kite, self.r)
         if not self.token2sym:
             raise RuntimeError(
                 "No instruments loaded (token2sym empty). "
                 "Check EXCHANGES env (e.g., NSE,BSE) and Kite entitlements/schema."
             )
 
-        self.active_tokens: List[int] = compute_active(self.sym2token, self.r, UNIVERSE_DEFAULT)
+        self.active_tokens: List[int] = [
+            t for t in compute_active(self.sym2token, self.r, UNIVERSE_DEFAULT, self.alias)
+            if shard_of(t, self.shards) == self.shard_id
+        ]
         if not self.active_tokens:
-            print("[ticker] WARNING: No active tokens computed. Check cfg:universe_limit and cfg:pinned in Redis.", file=sys.stderr)
+            print(f"[ticker{self._tag}] WARNING: No active tokens computed. Check cfg:universe_limit and cfg:pinned in Redis.", file=sys.stderr)
         else:
-            print(f"[ticker] Computed {len(self.active_tokens)} active tokens to subscribe", file=sys.stderr)
+            print(f"[ticker{self._tag}] Computed {len(self.active_tokens)} active tokens to subscribe", file=sys.stderr)
         
         self.subscribed: set[int] = set()
-        self.kws = KiteTicker(self.ks.api_key, self.ks.access_token, reconnect=True)
+        self.kws = None if offline else KiteTicker(self.ks.api_key, self.ks.access_token, reconnect=True)
         self.ind = MinuteIndicators()
-        self.current_bar: Dict[int, Bar] = {}
+        # Open bars keyed by minute index; a minute stays open until its grace window passes.
+        self.open_bars: Dict[int, Dict[int, Bar]] = defaultdict(dict)
+        # FULL-mode top-of-book per open minute: token -> [n, spread_bps_sum, imbalance_sum, bid, ask]
+        self.open_books: Dict[int, Dict[int, List[float]]] = defaultdict(dict)
         self.turnover: Dict[int, deque] = defaultdict(lambda: deque(maxlen=RANK_WINDOW_MIN))
         self._stop = threading.Event()
-        self._last_min = int(now_s() // 60)
-
-        # Resolve desired WebSocket streaming mode
-        self._ws_mode = {
-            "FULL": self.kws.MODE_FULL,
-            "QUOTE": self.kws.MODE_QUOTE,
-            "LTP": self.kws.MODE_LTP,
-        }.get(TICKER_WS_MODE, self.kws.MODE_QUOTE)
-
-        # Persist maps (guard empty)
-        if self.token2sym:
-            self.r.hset("inst:token2sym", mapping={str(k): v for k, v in self.token2sym.items()})
-        if self.sym2token:
-            self.r.hset("inst:sym2token", mapping={k: str(v) for k, v in self.sym2token.items()})
-        self.r.delete("symbols:active")
+        self.clock = now_ms  # epoch-ms source for the ingest path; tick_replay swaps in recorded time
+        self._closed_through = int(now_s() // 60) - 1  # last finalized minute index
+        self._next_rotate_s = now_s() + ROTATE_INTERVAL_SEC
+        self._last_recv_ms = 0  # receive time of the newest processed batch
+        self._late_ticks = 0
+
+        # Write-behind snapshot buffer: ticks and minute closes merge into the latest
+        # doc per token; _flush_snaps() writes only dirty tokens in one pipeline.
+        self._snap_lock = threading.Lock()
+        self._snap_cache: Dict[int, Dict[str, Any]] = {}
+        self._snap_dirty: set[int] = set()
+        self._snap_seeded: set[int] = set()  # tokens whose cache holds indicator fields
+        self._dirty_since_ms = 0               # receive time of the oldest unflushed tick
+        self._lb_rev: Optional[int] = None     # policy rev the leaderboard rows were scored with
+        self._lb_syms: set[str] = set()        # symbols this shard has in lb:{rev}
+        self._hb_pending = False
+
+        # Socket callback only enqueues; the ingest worker owns bars, indicators and Redis I/O.
+        self._tick_q = TickQueue(TICK_QUEUE_MAX, TICK_BACKPRESSURE)
+        self._init_metrics()
+        self._capture: Optional[tickcap.TickWriter] = None
+        if TICK_CAPTURE_DIR and not offline:
+            path = tickcap.capture_path(TICK_CAPTURE_DIR, ist_now().date().isoformat(), self.shard_id)
+            self._capture = tickcap.TickWriter(path)
+            print(f"[ticker{self._tag}] capturing raw ticks to {path}", file=sys.stderr)
+
+        # Background backfill: fetched history is applied by the ingest worker; live bars
+        # for tokens still waiting on history are held so indicators see bars in order.
+        self._hist_rl = RateLimiter(HIST_RATE_PER_SEC / self.shards)
+        self._backfill_q: "queue.Queue[Tuple[int, List[Bar], int, int]]" = queue.Queue()
+        self._backfill_pending: set[int] = set()
+        self._held_bars: Dict[int, List[Bar]] = defaultdict(list)
+
+        # Turnover rank across this shard's whole universe, fed by _probe_loop:
+        # token -> (day volume, ts_s) of the previous quote and smoothed turnover/minute.
+        self._quote_rl = RateLimiter(QUOTE_RATE_PER_SEC / self.shards)
+        self._probe_prev: Dict[int, Tuple[float, float]] = {}
+        self._probe_rate: Dict[int, float] = {}
+
+        # Resolve desired WebSocket streaming mode (per token when TIERED)
+        modes = {
+            "FULL": KiteTicker.MODE_FULL,
+            "QUOTE": KiteTicker.MODE_QUOTE,
+            "LTP": KiteTicker.MODE_LTP,
+        }
+        self._tiered = TICKER_WS_MODE == "TIERED"
+        self._ws_mode = modes.get(TIER_BASE_MODE if self._tiered else TICKER_WS_MODE, KiteTicker.MODE_QUOTE)
+        self._tier_modes = [  # highest tier first
+            ("pinned", modes.get(TIER_PINNED_MODE, KiteTicker.MODE_FULL)),
+            ("watch", modes.get(TIER_WATCH_MODE, KiteTicker.MODE_QUOTE)),
+            ("top", modes.get(TIER_TOP_MODE, KiteTicker.MODE_QUOTE)),
+        ]
+        self._tier_sets: Dict[str, set] = {}
+        self._token_mode: Dict[int, str] = {}  # mode each subscribed token currently streams in
+        self._next_retier_s = now_s()
+
+        if offline:
+            return
+        self._ckpt_path = os.path.join(CKPT_DIR, f"indicators-s{self.shard_id}.npz")
+        self._ckpt_countdown = CKPT_EVERY_MIN
+        self._ckpt_thread: Optional[threading.Thread] = None
+        if CKPT_EVERY_MIN > 0:
+            self._restore_checkpoint()
+        # Persist maps; every shard loads the same maps, shard 0 writes them (skipped when unchanged)
+        if self.shard_id == 0:
+            for key, mapping in (("inst:token2sym", self.token2sym), ("inst:sym2token", self.sym2token),
+                                 ("inst:alias", self.alias)):
+                if instruments.write_map(self.r, key, mapping):
+                    print(f"[ticker{self._tag}] wrote {key} ({len(mapping)} entries)", file=sys.stderr)
+        self._register_shard()
+        self._publish_active()
+
+    def _init_metrics(self):
+        m = self.metrics = metrics.Registry()
+        self._m_callbacks = m.counter("ticker_callbacks_total", "on_ticks callbacks received")
+        self._m_ticks = m.counter("ticker_ticks_total", "ticks received")
+        self._m_callback_s = m.histogram("ticker_callback_seconds", "time spent inside on_ticks")
+        self._m_queue_wait_s = m.histogram("ticker_queue_wait_seconds", "tick batch receive to processing start")
+        self._m_process_s = m.histogram("ticker_process_seconds", "bar/snapshot update per tick batch")
+        self._m_bars = m.counter("ticker_bars_closed_total", "minute bars finalized")
+        self._m_close_s = m.histogram("ticker_minute_close_seconds", "minute finalization, compute plus Redis")
+        self._m_close_redis_s = m.histogram("ticker_minute_close_redis_seconds", "minute finalization pipeline round trip")
+        self._m_flush_s = m.histogram("ticker_flush_redis_seconds", "snapshot flush pipeline round trip")
+        self._m_snaps = m.counter("ticker_snapshots_written_total", "snapshot writes from flushes")
+        self._m_lag_s = m.histogram("ticker_tick_to_snapshot_seconds", "oldest tick receive to snapshot write, per flush")
+        self._m_gauges = {
+            name: m.gauge(f"ticker_{name}", help) for name, help in (
+                ("queue_depth", "tick batches waiting"), ("queue_high_water", "max tick batches waiting"),
+                ("queue_dropped_ticks", "ticks dropped by backpressure"),
+                ("queue_coalesced_ticks", "ticks merged by backpressure"),
+                ("late_ticks", "ticks folded into a later minute"),
+                ("subscribed_tokens", "tokens subscribed on the socket"),
+                ("backfill_pending_tokens", "tokens waiting on history"),
+            )
+        }
+        self._next_metrics = 0.0
+
+    def _publish_metrics(self, pipe):
+        q, g = self._tick_q, self._m_gauges
+        g["queue_depth"].set(len(q))
+        g["queue_high_water"].set(q.high_water)
+        g["queue_dropped_ticks"].set(q.dropped)
+        g["queue_coalesced_ticks"].set(q.coalesced)
+        g["late_ticks"].set(self._late_ticks)
+        g["subscribed_tokens"].set(len(self.subscribed))
+        g["backfill_pending_tokens"].set(len(self._backfill_pending))
+        self.metrics.publish(pipe, f"metrics:ticker:{self.shard_id}")
+
+    def set_clock(self, clock):
+        """Drive minute closes from `clock` (epoch ms) instead of wall time."""
+        self.clock = clock
+        now = clock()
+        self._closed_through = int(now // 60000) - 1
+        self._next_rotate_s = now // 1000 + ROTATE_INTERVAL_SEC
+
+    @property
+    def _tag(self) -> str:
+        return f":{self.shard_id}" if self.shards > 1 else ""
+
+    # ------------- Shard coordination -------------
+    def _register_shard(self):
+        """Record this shard in ticker:shards and drop entries from a larger previous layout."""
+        stale = [k for k in (self.r.hkeys("ticker:shards") or []) if not k.isdigit() or int(k) >= self.shards]
+        if stale:
+            self.r.hdel("ticker:shards", *stale)
+        self.r.hset("ticker:shards", str(self.shard_id), json.dumps({
+            "shards": self.shards, "tokens": len(self.active_tokens),
+            "pid": os.getpid(), "started_ms": now_ms(),
+        }))
+
+    def _publish_active(self):
+        """Write this shard's slice and rebuild symbols:active as the union of all shards."""
+        key = f"symbols:active:{self.shard_id}"
+        pipe = self.r.pipeline(transaction=False)
+        pipe.delete(key)
         if self.active_tokens:
-            self.r.sadd("symbols:active", *[self.token2sym[t] for t in self.active_tokens])
+            pipe.sadd(key, *[self.token2sym[t] for t in self.active_tokens])
+        pipe.sunionstore("symbols:active", [f"symbols:active:{i}" for i in range(self.shards)])
+        pipe.execute()
+
+    def _mark_alive(self, pipe=None):
+        p = pipe or self.r.pipeline(transaction=False)
+        now = now_s()
+        p.set("ticker:alive", now)
+        p.set("ticker:heartbeat", now_ms())  # Also update heartbeat for session_status
+        p.set(f"ticker:heartbeat:{self.shard_id}", now_ms())
+        if pipe is None:
+            p.execute()
+
+    def _mark_down(self):
+        # With several shards the legacy global keys belong to whoever is still up.
+        if self.shards == 1:
+            self.r.set("ticker:alive", 0)
+        self.r.set(f"ticker:heartbeat:{self.shard_id}", 0)
 
     # ------------- Backfill (historical_data) -------------
-    def backfill(self):
-        end = ist_now()
-        start = end - timedelta(minutes=HIST_BACKFILL_MIN + 2)
-        for t in self.active_tokens:
-            sym = self.token2sym.get(t)
-            if not sym:
-                continue
+    def _fetch_history(self, token: int, start: datetime, end: datetime) -> List[Bar]:
+        """historical_data for one token under the shared rate limit, retrying transient errors."""
+        for attempt in range(BACKFILL_RETRIES + 1):
+            if self._stop.is_set():
+                return []
+            self._hist_rl.wait()
             try:
                 candles = self.kite.historical_data(
-                    instrument_token=t,
+                    instrument_token=token,
                     from_date=start,
                     to_date=end,
                     interval=HIST_INTERVAL,
                     continuous=False,
                     oi=False,
                 )
+                break
+            except TokenException:
+                raise
             except Exception:
+                if attempt >= BACKFILL_RETRIES:
+                    raise
+                time.sleep(1.0 * (attempt + 1))
+        cutoff = int(end.timestamp() // 60) * 60  # the still-forming minute belongs to the live feed
+        bars: List[Bar] = []
+        for c in candles or []:
+            ts = int(c["date"].timestamp())
+            if ts >= cutoff:
                 continue
-            bars: List[Bar] = []
-            for c in candles:
-                ts = int(c["date"].timestamp())
-                v  = float(c["volume"])
-                px = float(c["close"])
-                bars.append(Bar(
-                    t=ts, o=float(c["open"]), h=float(c["high"]),
-                    l=float(c["low"]), c=px, v=v,
-                    vwap_num=px * v, vwap_den=v,
-                ))
-            for b in bars[-BARS_CAP:]:
-                self.ind.on_minute_close(t, b)
-                # Persist finalized historical minute bar (snap to IST minute-open)
+            v  = float(c["volume"])
+            px = float(c["close"])
+            bars.append(Bar(
+                t=ts, o=float(c["open"]), h=float(c["high"]),
+                l=float(c["low"]), c=px, v=v,
+                vwap_num=px * v, vwap_den=v,
+            ))
+        return bars[-BARS_CAP:]
+
+    def _load_stored(self, tokens: List[int], start_s: int, cutoff_s: int) -> Dict[int, Tuple[List[Bar], int]]:
+        """
+        Read today's bars:{sym}:{date} archive and the head of bars:{sym} for tokens,
+        pipelined in BACKFILL_READ_CHUNK batches. Returns token -> (archived bars in
+        [start_s, cutoff_s) ordered by minute, newest minute already in bars:{sym}).
+        """
+        date = dt.datetime.fromtimestamp(cutoff_s, IST).date().isoformat()
+        out: Dict[int, Tuple[List[Bar], int]] = {}
+        tokens = [t for t in tokens if t in self.token2sym]
+        for i in range(0, len(tokens), max(1, BACKFILL_READ_CHUNK)):
+            chunk = tokens[i:i + BACKFILL_READ_CHUNK]
+            pipe = self.r.pipeline(transaction=False)
+            for t in chunk:
+                sym = self.token2sym[t]
+                pipe.lrange(f"bars:{sym}:{date}", 0, -1)
+                pipe.lindex(f"bars:{sym}", 0)
+            res = pipe.execute()
+            for j, t in enumerate(chunk):
+                raw_arch, raw_head = res[2 * j], res[2 * j + 1]
+                by_t: Dict[int, Bar] = {}
+                for raw in raw_arch or []:
+                    try:
+                        b = bar_from_doc(json.loads(raw))
+                    except Exception:
+                        continue
+                    if start_s <= b.t < cutoff_s:
+                        by_t[b.t] = b  # earlier restarts may have archived a minute twice
                 try:
-                    ist_dt = dt.datetime.fromtimestamp(b.t, IST).replace(second=0, microsecond=0)
-                    bar_doc = {
-                        "ts": ist_dt.isoformat(),
-                        "o": float(b.o), "h": float(b.h), "l": float(b.l), "c": float(b.c),
-                        "v": int(b.v),
-                    }
-                    record_minute_bar(sym, bar_doc)
+                    listed = int(json.loads(raw_head)["t"]) if raw_head else 0
                 except Exception:
-                    pass
-                self.r.lpush(f"bars:{sym}", json.dumps(b.__dict__))
-                self.r.ltrim(f"bars:{sym}", 0, BARS_CAP - 1)
-            if bars:
-                snap = self.ind.snapshot(t)
-                snap["ts_ms"] = int(bars[-1].t * 1000)
-                self.r.setex(f"snap:{sym}", 3600, json.dumps(snap))
+                    listed = 0
+                out[t] = ([by_t[k] for k in sorted(by_t)], listed)
+        return out
+
+    def backfill(self, tokens: List[int]):
+        """
+        Seed tokens from today's stored archive and fetch only the minutes it is
+        missing, with BACKFILL_WORKERS threads sharing this shard's slice of HIST_RATE_PER_SEC.
+        Results go to the ingest worker via _backfill_q; progress and per-token
+        errors land in ticker:backfill:{shard} and ticker:backfill:errors:{shard}.
+        """
+        end = ist_now()
+        start = end - timedelta(minutes=HIST_BACKFILL_MIN + 2)
+        start_s, cutoff_s = int(start.timestamp()), int(end.timestamp() // 60) * 60
+        oh, om = parse_time_hhmm(MARKET_OPEN)
+        open_s = int(end.replace(hour=oh, minute=om, second=0, microsecond=0).timestamp())
+        key, errkey = f"ticker:backfill:{self.shard_id}", f"ticker:backfill:errors:{self.shard_id}"
+        total, done, failed, reused = len(tokens), 0, 0, 0
+        self.r.delete(errkey)
+        self.r.hset(key, mapping={"state": "running", "total": total, "done": 0, "failed": 0,
+                                  "reused": 0, "fetched": 0, "started_ms": now_ms()})
+        reported: set[int] = set()
+        stored: Dict[int, Tuple[List[Bar], int]] = {}
+
+        def marks(t: int) -> Tuple[List[Bar], int, int]:
+            """(archived bars, newest archived minute, newest minute in bars:{sym}) for t."""
+            arch, listed = stored.get(t, ([], 0))
+            return arch, (arch[-1].t if arch else 0), listed
+
+        def report(t: int, bars: List[Bar]):
+            nonlocal done
+            _, stored_t, listed = marks(t)
+            self._backfill_q.put((t, bars, stored_t, listed))
+            reported.add(t)
+            done += 1
+            if done % 25 == 0 or done == total:
+                self.r.hset(key, mapping={"done": done, "failed": failed})
+                print(f"[ticker{self._tag}] backfill progress {done}/{total} failed={failed}", file=sys.stderr)
+
+        try:
+            stored = self._load_stored(tokens, start_s, cutoff_s)
+            jobs: Dict[int, datetime] = {}
+            for t in tokens:
+                arch = stored.get(t, ([], 0))[0]
+                if arch and arch[-1].t >= cutoff_s - 60:
+                    reused += 1
+                    report(t, arch)  # archive is current; nothing to fetch
+                elif arch and arch[0].t <= max(start_s + 60, open_s):
+                    jobs[t] = datetime.fromtimestamp(arch[-1].t + 60, IST)  # tail only
+                else:
+                    jobs[t] = start
+            self.r.hset(key, mapping={"reused": reused, "fetched": len(jobs)})
+            print(f"[ticker{self._tag}] backfill reused={reused} fetching={len(jobs)}", file=sys.stderr)
+
+            with ThreadPoolExecutor(max_workers=max(1, BACKFILL_WORKERS), thread_name_prefix="backfill") as ex:
+                futs = {ex.submit(self._fetch_history, t, frm, end): t for t, frm in jobs.items()}
+                for fut in as_completed(futs):
+                    t = futs[fut]
+                    merged = {b.t: b for b in stored.get(t, ([], 0))[0]}
+                    try:
+                        for b in fut.result():
+                            if start_s <= b.t:
+                                merged.setdefault(b.t, b)
+                    except Exception as e:
+                        failed += 1
+                        self.r.hset(errkey, self.token2sym.get(t, str(t)), str(e)[:200])
+                        print(f"[ticker{self._tag}] backfill failed token={t} sym={self.token2sym.get(t)} err={e}", file=sys.stderr)
+                    report(t, [merged[k] for k in sorted(merged)])
+        finally:
+            # Never leave live bars held for tokens whose history will not arrive.
+            for t in tokens:
+                if t not in reported:
+                    self._backfill_q.put((t, *marks(t)))  # stored minutes are not rewritten
+            self.r.hset(key, mapping={"state": "done", "done": done, "failed": failed, "finished_ms": now_ms()})
+
+    def _apply_backfill(self, token: int, bars: List[Bar], stored_t: int = 0, listed_t: int = 0):
+        """
+        Seed indicators with history, then replay live bars held meanwhile (worker thread).
+        Minutes at or before stored_t are already archived and those at or before
+        listed_t are already in bars:{sym}, so only newer bars are written.
+        """
+        if token not in self._backfill_pending:
+            return  # rotated out while its history was in flight
+        self._backfill_pending.discard(token)
+        held = self._held_bars.pop(token, [])
+        if held:
+            bars = [b for b in bars if b.t < held[0].t]
+        feed = bars + held
+        folded_t = self.ind.last_time(token)  # restored from a checkpoint
+        to_fold = [b for b in feed if b.t > folded_t]
+        sym = self.token2sym.get(token)
+        if not feed or not sym:
+            return
+        for b in to_fold:
+            self.ind.on_minute_close(token, b)
+        snap = self.ind.snapshot(token)
+        snap["ts_ms"] = now_ms() if held else int(feed[-1].t * 1000)
+        ttl = SNAP_TTL_S if held else 3600
+
+        pipe = self.r.pipeline(transaction=False)
+        for b in feed:
+            if b.t > stored_t:
+                # Persist finalized minute bar (snap to IST minute-open)
+                record_minute_bar(sym, bar_doc(b), pipe=pipe)
+        for b in held:
+            streams.add_bar(pipe, sym, bar_doc(b))  # live minutes delayed behind history
+        fresh = [json.dumps(asdict(b)) for b in feed if b.t > listed_t]
+        if fresh:
+            pipe.lpush(f"bars:{sym}", *fresh)
+            pipe.ltrim(f"bars:{sym}", 0, BARS_CAP - 1)
+        with self._snap_lock:
+            prev = self._snap_cache.get(token) or {}
+            if int(prev.get("ts_ms") or 0) > snap["ts_ms"]:
+                snap["last_price"], snap["ts_ms"] = prev["last_price"], prev["ts_ms"]
+            self._snap_cache[token] = snap
+            self._snap_seeded.add(token)
+            self._snap_dirty.discard(token)
+        snapstore.put_snap(pipe, sym, snap, ttl)
+        pipe.execute()
+
+    def _drain_backfill(self):
+        while True:
+            try:
+                t, bars, stored_t, listed_t = self._backfill_q.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._apply_backfill(t, bars, stored_t, listed_t)
+            except Exception as e:
+                print(f"[ticker{self._tag}] backfill apply failed token={t} err={e}", file=sys.stderr)
 
     # ------------- Subscriptions / rotation -------------
+    def _ws_send(self, what: str, fn, *args):
+        """
+        Run a KiteTicker socket call on the reactor thread; Twisted transports are
+        not thread-safe. On the reactor (e.g. _on_connect) it runs inline and raises
+        to the caller; from the ingest worker it is queued with callFromThread and
+        failures are logged there. Subscription bookkeeping stays with the caller.
+        """
+        if threadable.isInIOThread():
+            return fn(*args)
+
+        def call():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[ticker{self._tag}] {what} failed size={len(args[-1])} err={e}", file=sys.stderr)
+        reactor.callFromThread(call)
+
     def _subscribe_active(self):
         to_add = [t for t in self.active_tokens if t not in self.subscribed]
         if not to_add:
-            print("[ticker] No new tokens to subscribe", file=sys.stderr)
+            print(f"[ticker{self._tag}] No new tokens to subscribe", file=sys.stderr)
             return
-        print(f"[ticker] Subscribing to {len(to_add)} tokens in mode={TICKER_WS_MODE}...", file=sys.stderr)
+        print(f"[ticker{self._tag}] Subscribing to {len(to_add)} tokens in mode={TICKER_WS_MODE}...", file=sys.stderr)
+        if self._tiered:
+            self._load_tiers()
 
         batch_size = max(0, int(ROTATE_BATCH)) or len(to_add)
         for i in range(0, len(to_add), batch_size):
             batch = to_add[i:i + batch_size]
             try:
-                self.kws.subscribe(batch)
-                self.kws.set_mode(self._ws_mode, batch)
+                self._ws_send("subscribe", self.kws.subscribe, batch)
+                self._set_modes(batch)
                 self.subscribed.update(batch)
-                self.r.sadd("subs:tokens", *[str(t) for t in batch])
+                self.r.sadd(f"subs:tokens{self._tag}", *[str(t) for t in batch])
+            except Exception as e:
+                print(f"[ticker{self._tag}] subscribe batch failed size={len(batch)} err={e}", file=sys.stderr)
+        print(f"[ticker{self._tag}] Successfully subscribed to {len(to_add)} tokens (batched {batch_size})", file=sys.stderr)
+
+    def _mode_for(self, t: int) -> str:
+        for tier, mode in self._tier_modes:
+            if t in self._tier_sets.get(tier, ()):
+                return mode
+        return self._ws_mode
+
+    def _set_modes(self, tokens: List[int]):
+        """set_mode for tokens, grouped by the mode each should stream in."""
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for t in tokens:
+            groups[self._mode_for(t) if self._tiered else self._ws_mode].append(t)
+        for mode, batch in groups.items():
+            self._ws_send(f"set_mode {mode}", self.kws.set_mode, mode, batch)
+            for t in batch:
+                self._token_mode[t] = mode
+
+    def _token_of(self, sym: str) -> Optional[int]:
+        """Token for sym, following inst:alias from a duplicate listing to the streamed one."""
+        return self.sym2token.get(self.alias.get(sym, sym))
+
+    def _load_tiers(self):
+        """Refresh tier membership from cfg:pinned, cfg:watchlist and plan:top."""
+        pipe = self.r.pipeline(transaction=False)
+        pipe.smembers("cfg:pinned")
+        pipe.smembers("cfg:watchlist")
+        pipe.zrevrange("plan:top", 0, max(0, TIER_TOP_N - 1))
+        pipe.get("policy:rev")
+        pinned, watch, top, rev = pipe.execute()
+        if LEADERBOARD and rev:
+            # The minute-close leaderboard is fresher than plan:top (only written by slow-path plans).
+            top = self.r.zrevrange(engine_v2.lb_key(int(rev)), 0, max(0, TIER_TOP_N - 1)) or top
+        to_tokens = lambda syms: {t for t in map(self._token_of, syms or []) if t is not None}
+        self._tier_sets = {"pinned": to_tokens(pinned), "watch": to_tokens(watch), "top": to_tokens(top)}
+
+    def _retier(self):
+        """Upgrade/demote subscribed tokens whose tier changed since the last pass."""
+        self._load_tiers()
+        changed: Dict[str, List[int]] = defaultdict(list)
+        for t in self.subscribed:
+            mode = self._mode_for(t)
+            if self._token_mode.get(t) != mode:
+                changed[mode].append(t)
+        for mode, batch in changed.items():
+            try:
+                self._ws_send(f"set_mode {mode}", self.kws.set_mode, mode, batch)
+                for t in batch:
+                    self._token_mode[t] = mode
+            except Exception as e:
+                print(f"[ticker{self._tag}] set_mode {mode} failed size={len(batch)} err={e}", file=sys.stderr)
+        self._publish_tiers()
+        if changed:
+            print(f"[ticker{self._tag}] retiered " + " ".join(f"{m}={len(b)}" for m, b in changed.items()), file=sys.stderr)
+
+    def _publish_tiers(self):
+        """Replace ticker:tiers:{shard} with per-mode counts of subscribed tokens (drops emptied modes)."""
+        counts = defaultdict(int)
+        for t in self.subscribed:
+            counts[self._token_mode.get(t, "")] += 1
+        key = f"ticker:tiers:{self.shard_id}"
+        pipe = self.r.pipeline()  # MULTI: readers never see the hash half-rewritten
+        pipe.delete(key)
+        pipe.hset(key, mapping={m or "unset": n for m, n in counts.items()} or {"ltp": 0})
+        pipe.execute()
+
+    def _probe_universe(self, tokens: List[int]):
+        """Quote one chunk of tokens and fold day-volume deltas into the turnover rank."""
+        syms = [self.token2sym[t] for t in tokens if t in self.token2sym]
+        if not syms:
+            return
+        self._quote_rl.wait()
+        quotes = self.kite.quote(syms) or {}
+        now = time.time()
+        scores: Dict[str, float] = {}
+        for sym, q in quotes.items():
+            t = self.sym2token.get(sym)
+            vol = float(q.get("volume") or 0)
+            px = float(q.get("average_price") or q.get("last_price") or 0)
+            if t is None:
+                continue
+            prev = self._probe_prev.get(t)
+            self._probe_prev[t] = (vol, now)
+            if prev is None or vol < prev[0] or now - prev[1] < 1:
+                continue  # first sighting or a new session: baseline only
+            rate = (vol - prev[0]) * px / ((now - prev[1]) / 60.0)
+            old = self._probe_rate.get(t)
+            self._probe_rate[t] = rate if old is None else 0.5 * old + 0.5 * rate
+            scores[sym] = round(self._probe_rate[t], 2)
+        if scores:
+            self.r.zadd("rank:turnover", scores)
+
+    def _probe_loop(self):
+        """Round-robin kite.quote over this shard's universe, one chunk per slot of its QUOTE_RATE_PER_SEC share."""
+        universe = [t for t in self.token2sym if shard_of(t, self.shards) == self.shard_id]
+        chunk = max(1, min(500, ROTATE_PROBE_CHUNK))
+        print(f"[ticker{self._tag}] probing {len(universe)} symbols in chunks of {chunk}", file=sys.stderr)
+        i = 0
+        while not self._stop.is_set():
+            if not is_market_open():
+                self._stop.wait(30)
+                continue
+            batch = universe[i:i + chunk]
+            i = i + chunk if i + chunk < len(universe) else 0
+            try:
+                self._probe_universe(batch)
             except Exception as e:
-                print(f"[ticker] subscribe batch failed size={len(batch)} err={e}", file=sys.stderr)
-        print(f"[ticker] Successfully subscribed to {len(to_add)} tokens (batched {batch_size})", file=sys.stderr)
+                print(f"[ticker{self._tag}] probe failed err={e}", file=sys.stderr)
+                self._stop.wait(5)
+
+    def _turnover_score(self, t: int) -> float:
+        """Turnover per minute: live bars for subscribed tokens, quote probes for the rest."""
+        live = self.turnover.get(t)
+        if live and sum(live) > 0:  # LTP-mode ticks carry no quantity
+            return sum(live) / len(live)
+        return self._probe_rate.get(t, 0.0)
 
     def _rotate_active(self):
-        ranked = sorted(self.active_tokens, key=lambda t: sum(self.turnover[t]) if self.turnover[t] else 0.0, reverse=True)
-        new_active = ranked[:len(self.active_tokens)]
-        if set(new_active) == set(self.active_tokens):
+        """
+        Swap the weakest unpinned active tokens for higher-turnover symbols from the
+        probe rank, at most ROTATE_MAX_SWAPS per cycle. A challenger must beat the
+        incumbent it replaces by ROTATE_HYSTERESIS so symbols don't flap.
+        """
+        pinned = {t for t in map(self._token_of, self.r.smembers("cfg:pinned") or []) if t is not None}
+        active = set(self.active_tokens)
+        rates = dict(self._probe_rate)
+        challengers = sorted((t for t in rates if t not in active), key=lambda t: rates[t], reverse=True)
+        incumbents = sorted((t for t in self.active_tokens if t not in pinned), key=self._turnover_score)
+        add: List[int] = []
+        remove: List[int] = []
+        for c, inc in zip(challengers[:max(0, ROTATE_MAX_SWAPS)], incumbents):
+            if rates[c] <= self._turnover_score(inc) * (1.0 + ROTATE_HYSTERESIS):
+                break
+            add.append(c)
+            remove.append(inc)
+        if not add:
             return
-        remove = [t for t in self.subscribed if t not in new_active]
-        add = [t for t in new_active if t not in self.subscribed]
-        if add:
-            batch_size = max(0, int(ROTATE_BATCH)) or len(add)
-            for i in range(0, len(add), batch_size):
-                batch = add[i:i + batch_size]
-                try:
-                    self.kws.subscribe(batch)
-                    self.kws.set_mode(self._ws_mode, batch)
-                    self.subscribed.update(batch)
-                except Exception as e:
-                    print(f"[ticker] rotate subscribe batch failed size={len(batch)} err={e}", file=sys.stderr)
+
+        batch_size = max(0, int(ROTATE_BATCH)) or len(add)
+        added: List[int] = []
+        for i in range(0, len(add), batch_size):
+            batch = add[i:i + batch_size]
+            try:
+                self._ws_send("rotate subscribe", self.kws.subscribe, batch)
+                self._set_modes(batch)
+                self.subscribed.update(batch)
+                added.extend(batch)
+            except Exception as e:
+                print(f"[ticker{self._tag}] rotate subscribe batch failed size={len(batch)} err={e}", file=sys.stderr)
+        remove = remove[:len(added)]  # never shrink below the budget's worth of live feeds
         if remove:
-            self.kws.unsubscribe(remove)
+            try:
+                self._ws_send("rotate unsubscribe", self.kws.unsubscribe, remove)
+            except Exception as e:
+                print(f"[ticker{self._tag}] rotate unsubscribe failed size={len(remove)} err={e}", file=sys.stderr)
             for t in remove:
                 self.subscribed.discard(t)
-        self.active_tokens = new_active
-        self.r.delete("symbols:active")
-        if self.active_tokens:
-            self.r.sadd("symbols:active", *[self.token2sym[t] for t in self.active_tokens])
+                self._token_mode.pop(t, None)
+                self.turnover.pop(t, None)
+                self.ind.reset(t)  # history is refetched if it rotates back in
+                self._backfill_pending.discard(t)
+                self._held_bars.pop(t, None)
+            self.r.srem(f"subs:tokens{self._tag}", *[str(t) for t in remove])
+            if self._tiered:
+                self._publish_tiers()
+        if added:
+            self.r.sadd(f"subs:tokens{self._tag}", *[str(t) for t in added])
+        gone = set(remove)
+        self.active_tokens = [t for t in self.active_tokens if t not in gone] + added
+        self._publish_active()
+        print(f"[ticker{self._tag}] rotated in={len(added)} out={len(remove)}", file=sys.stderr)
+
+        # Swapped-in symbols start cold; backfill them like at startup.
+        if added:
+            self._backfill_pending.update(added)
+            threading.Thread(target=self.backfill, args=(added,), name="backfill-rotate", daemon=True).start()
 
     # ------------- Tick / minute handling -------------
-    def _on_ticks(self, ws, ticks):
-        now = now_s()
-        cur_min = int(now // 60)
-
-        if cur_min != self._last_min:
-            for t, bar in list(self.current_bar.items()):
-                self.ind.on_minute_close(t, bar)
-                sym = self.token2sym.get(t)
-                if sym:
-                    # Persist finalized live minute bar (minute-open boundary)
-                    try:
-                        ist_dt = dt.datetime.fromtimestamp(bar.t, IST).replace(second=0, microsecond=0)
-                        bar_doc = {
-                            "ts": ist_dt.isoformat(),  # "YYYY-MM-DDTHH:MM:00+05:30"
-                            "o": float(bar.o), "h": float(bar.h),
-                            "l": float(bar.l), "c": float(bar.c),
-                            "v": int(bar.v),
-                        }
-                        record_minute_bar(sym, bar_doc)
-                    except Exception:
-                        pass
+    def _on_ticks(self, ws, ticks, recv_ms: Optional[int] = None):
+        """KiteTicker reactor callback: enqueue only, no Redis or indicator work."""
+        t0 = time.perf_counter()
+        recv_ms = recv_ms or self.clock()  # replay passes the recorded receive time
+        self._tick_q.put(recv_ms, ticks)
+        if self._capture is not None:
+            self._capture.append(recv_ms, ticks)
+        self._m_callbacks.inc()
+        self._m_ticks.inc(len(ticks))
+        self._m_callback_s.observe(time.perf_counter() - t0)
+
+    def _process_ticks(self, recv_ms: int, ticks: List[dict]):
+        self._last_recv_ms = recv_ms
+        recv_min = int(recv_ms // 60000)
+        first_open = self._closed_through + 1
+
+        with self._snap_lock:
+            self._hb_pending = True
+            if not self._snap_dirty:
+                self._dirty_since_ms = recv_ms
+            for tk in ticks:
+                token = tk.get("instrument_token")
+                lp    = tk.get("last_price")
+                qty   = tk.get("last_quantity") or 0
+                if not token or lp is None:
+                    continue
+                price = float(lp); qty = float(qty)
+                # Coalesced ticks (see TickQueue) carry the range/volume they absorbed.
+                hi, lo = tk.get("_hi", price), tk.get("_lo", price)
+
+                # Bucket by exchange time when present so ticks arriving within the
+                # grace window still land in the minute they traded in.
+                m = recv_min
+                ets = tk.get("exchange_timestamp")
+                if isinstance(ets, datetime):
+                    m = min(recv_min, int(ets.timestamp() // 60))
+                if m < first_open:
+                    self._late_ticks += 1
+                    m = first_open
+                bars = self.open_bars[m]
+
+                bar = bars.get(token)
+                if bar is None:
+                    bar = Bar(t=m * 60, o=tk.get("_o", price), h=hi, l=lo, c=price, v=0.0, vwap_num=0.0, vwap_den=0.0)
+                    bars[token] = bar
+                else:
+                    bar.h = max(bar.h, hi)
+                    bar.l = min(bar.l, lo)
+                    bar.c = price
+                if qty > 0:
+                    bar.v += qty
+                    bar.vwap_num += tk.get("_pv", price * qty)
+                    bar.vwap_den += qty
+
+                book = book_top(tk.get("depth"))
+                if book is not None:
+                    acc = self.open_books[m].get(token)
+                    if acc is None:
+                        acc = self.open_books[m][token] = [0, 0.0, 0.0, 0.0, 0.0]
+                    acc[0] += 1; acc[1] += book[2]; acc[2] += book[3]
+                    acc[3], acc[4] = book[0], book[1]
+
+                if token in self.token2sym:
+                    doc = self._snap_cache.get(token)
+                    if doc is None:
+                        doc = self._snap_cache[token] = {}
+                    doc["last_price"] = round(price, 2)
+                    doc["ts_ms"] = recv_ms
+                    self._snap_dirty.add(token)
+
+    def _close_due_minutes(self, now_ms_: int):
+        """Finalize every open minute whose wall-clock end + MINUTE_CLOSE_GRACE_MS has passed."""
+        due = (now_ms_ - MINUTE_CLOSE_GRACE_MS) // 60000 - 1
+        if due > self._closed_through:
+            for m in sorted(k for k in self.open_bars if k <= due):
+                closed = list(self.open_bars.pop(m).items())
+                books = self.open_books.pop(m, {})
+                try:
+                    self._finalize_minute(closed, books)
+                except Exception as e:
+                    print(f"[ticker{self._tag}] minute close failed: {e}", file=sys.stderr)
+            self._closed_through = due
+
+        if self.kws is not None and now_ms_ // 1000 >= self._next_rotate_s:
+            self._next_rotate_s = now_ms_ // 1000 + ROTATE_INTERVAL_SEC
+            try:
+                self._rotate_active()
+            except Exception:
+                pass
 
-                    self.r.lpush(f"bars:{sym}", json.dumps(bar.__dict__))
-                    self.r.ltrim(f"bars:{sym}", 0, BARS_CAP - 1)
+        if self._tiered and self.kws is not None and now_ms_ // 1000 >= self._next_retier_s:
+            self._next_retier_s = now_ms_ // 1000 + TIER_REFRESH_SEC
+            try:
+                self._retier()
+            except Exception as e:
+                print(f"[ticker{self._tag}] retier failed: {e}", file=sys.stderr)
+
+    def _finalize_minute(self, closed: List[Tuple[int, Bar]], books: Optional[Dict[int, List[float]]] = None):
+        """
+        Fold closed bars into the indicators and write every bar append, trim,
+        per-date archive entry and snapshot for the universe in one pipeline.
+        """
+        if not closed:
+            return
+        t0 = time.perf_counter()
+        if self._backfill_pending:
+            for t, bar in closed:
+                if t in self._backfill_pending:
+                    self._held_bars[t].append(bar)
                     self.turnover[t].append(bar.c * bar.v)
-                    snap = self.ind.snapshot(t)
-                    if snap:
-                        snap["ts_ms"] = now_ms()
-                        self.r.setex(f"snap:{sym}", 120, json.dumps(snap))
-            self.current_bar.clear()
-            self._last_min = cur_min
-            if (now % ROTATE_INTERVAL_SEC) < 2:
-                try:
-                    self._rotate_active()
-                except Exception:
-                    pass
-
-        self.r.set("ticker:alive", now)
-        self.r.set("ticker:heartbeat", now_ms())  # Also update heartbeat for session_status
-        for tk in ticks:
-            token = tk.get("instrument_token")
-            lp    = tk.get("last_price")
-            qty   = tk.get("last_quantity") or 0
-            if not token or lp is None:
+            closed = [(t, bar) for t, bar in closed if t not in self._backfill_pending]
+            if not closed:
+                return
+        tokens = [t for t, _ in closed]
+        self.ind.close_many(tokens, [b for _, b in closed])
+        self.ind.set_book(tokens, [(books or {}).get(t) for t in tokens])
+        snaps = self.ind.snapshot_many(tokens)
+        ts = self.clock()
+        with self._snap_lock:
+            prevs = [self._snap_cache.get(t) or {} for t in tokens]
+
+        pipe = self.r.pipeline(transaction=MINUTE_CLOSE_MULTI)
+        written: List[Tuple[int, Dict[str, Any]]] = []
+        for (t, bar), snap, prev in zip(closed, snaps, prevs):
+            sym = self.token2sym.get(t)
+            if not sym:
                 continue
-            price = float(lp); qty = float(qty)
-
-            bar = self.current_bar.get(token)
-            if bar is None:
-                bar = Bar(t=cur_min * 60, o=price, h=price, l=price, c=price, v=0.0, vwap_num=0.0, vwap_den=0.0)
-                self.current_bar[token] = bar
-            else:
-                bar.h = max(bar.h, price)
-                bar.l = min(bar.l, price)
-                bar.c = price
-            if qty > 0:
-                bar.v += qty
-                bar.vwap_num += price * qty
-                bar.vwap_den += qty
-
-            sym = self.token2sym.get(token)
-            if sym:
-                snap = {"last_price": round(price, 2), "ts_ms": now_ms()}
-                prev = self.r.get(f"snap:{sym}")
-                if prev:
+            # Persist finalized live minute bar (minute-open boundary)
+            doc = bar_doc(bar)
+            record_minute_bar(sym, doc, pipe=pipe)
+            streams.add_bar(pipe, sym, doc)
+            pipe.lpush(f"bars:{sym}", json.dumps(asdict(bar)))
+            pipe.ltrim(f"bars:{sym}", 0, BARS_CAP - 1)
+            self.turnover[t].append(bar.c * bar.v)
+            if snap:
+                snap["ts_ms"] = ts
+                # Ticks for the next minute can land during the close grace window;
+                # keep that newer price rather than rewinding to this bar's close.
+                if int(prev.get("ts_ms") or 0) >= (bar.t + 60) * 1000:
+                    snap["last_price"], snap["ts_ms"] = prev["last_price"], prev["ts_ms"]
+                snapstore.put_snap(pipe, sym, snap, SNAP_TTL_S)
+                written.append((t, snap))
+        cmds = len(pipe)
+        t1 = time.perf_counter()
+        pipe.execute()
+        t2 = time.perf_counter()
+        self._m_bars.inc(len(closed))
+        self._m_close_s.observe(t2 - t0)
+        self._m_close_redis_s.observe(t2 - t1)
+
+        with self._snap_lock:
+            for t, snap in written:
+                self._snap_cache[t] = snap
+                self._snap_seeded.add(t)
+                self._snap_dirty.discard(t)
+        if CKPT_EVERY_MIN > 0 and not self.offline:
+            self._ckpt_countdown -= 1
+            if self._ckpt_countdown <= 0:
+                self._ckpt_countdown = CKPT_EVERY_MIN
+                self._checkpoint()
+        if LEADERBOARD:
+            try:
+                self._update_leaderboard(written)
+            except Exception as e:
+                print(f"[ticker{self._tag}] leaderboard update failed: {e}", file=sys.stderr)
+        print(
+            f"[ticker{self._tag}] minute close bars={len(closed)} snaps={len(written)} "
+            f"compute_ms={(t1 - t0) * 1000:.1f} redis_ms={(t2 - t1) * 1000:.1f} cmds={cmds}",
+            file=sys.stderr,
+        )
+
+    # ------------- Indicator checkpoints -------------
+    def _checkpoint(self, wait: bool = False):
+        """Copy indicator state now; write it on a background thread (joined when wait=True)."""
+        if self._ckpt_thread is not None and self._ckpt_thread.is_alive():
+            if not wait:
+                return  # previous write still running; skip this round
+            self._ckpt_thread.join()
+        state = self.ind.state()
+        meta = {
+            "date": ist_now().date().isoformat(), "shard_id": self.shard_id, "shards": self.shards,
+            "saved_ms": now_ms(), "closed_through": self._closed_through,
+            "turnover": {str(t): list(q) for t, q in self.turnover.items() if q},
+        }
+
+        def write():
+            t0 = time.perf_counter()
+            try:
+                save_state(self._ckpt_path, state, meta)
+                print(f"[ticker{self._tag}] checkpoint tokens={len(state['_tokens'])} ms={(time.perf_counter() - t0) * 1000:.1f}", file=sys.stderr)
+            except Exception as e:
+                print(f"[ticker{self._tag}] checkpoint failed: {e}", file=sys.stderr)
+
+        self._ckpt_thread = threading.Thread(target=write, name="checkpoint", daemon=True)
+        self._ckpt_thread.start()
+        if wait:
+            self._ckpt_thread.join()
+
+    def _restore_checkpoint(self):
+        """Reload indicator state saved earlier in this session by the same shard layout."""
+        if not os.path.exists(self._ckpt_path):
+            return
+        try:
+            state, meta = load_state(self._ckpt_path)
+            if meta.get("date") != ist_now().date().isoformat():
+                print(f"[ticker{self._tag}] checkpoint is from {meta.get('date')}; starting fresh", file=sys.stderr)
+                return
+            if meta.get("shards") != self.shards or meta.get("shard_id") != self.shard_id:
+                print(f"[ticker{self._tag}] checkpoint shard layout differs; starting fresh", file=sys.stderr)
+                return
+            self.ind = MinuteIndicators.from_state(state)
+            for t, vals in (meta.get("turnover") or {}).items():
+                self.turnover[int(t)].extend(vals)
+            age_s = (now_ms() - int(meta.get("saved_ms") or 0)) / 1000
+            print(f"[ticker{self._tag}] restored indicators for {len(self.ind.slots)} tokens from checkpoint ({age_s:.0f}s old)", file=sys.stderr)
+        except Exception as e:
+            self.ind = MinuteIndicators()
+            print(f"[ticker{self._tag}] checkpoint restore failed, starting fresh: {e}", file=sys.stderr)
+
+    def _update_leaderboard(self, written: List[Tuple[int, Dict[str, Any]]]):
+        """Re-score symbols whose minute just closed; rescore everything after a policy change."""
+        cp = engine_v2.get_policy()
+        rev = cp.rev
+        active = {self.token2sym[t] for t in self.active_tokens if t in self.token2sym}
+        if rev != self._lb_rev:
+            with self._snap_lock:
+                docs = {self.token2sym[t]: dict(self._snap_cache[t]) for t in self._snap_seeded
+                        if t in self._snap_cache and self.token2sym.get(t) in active}
+            self._lb_syms = set()
+        else:
+            docs = {self.token2sym[t]: snap for t, snap in written if self.token2sym.get(t) in active}
+        gone = sorted(self._lb_syms - active)
+        pipe = self.r.pipeline(transaction=False)
+        engine_v2.publish_leaderboard(pipe, cp, docs, gone)
+        pipe.execute()
+        self._lb_rev = rev
+        self._lb_syms = (self._lb_syms - set(gone)) | set(docs)
+
+    def _flush_snaps(self):
+        """Write dirty snapshots and the heartbeat in one pipeline round trip."""
+        with self._snap_lock:
+            dirty, self._snap_dirty = self._snap_dirty, set()
+            hb, self._hb_pending = self._hb_pending, False
+            since = self._dirty_since_ms
+            # Only the JSON layout rewrites whole docs; hash fields update in place.
+            unseeded = [t for t in dirty if t not in self._snap_seeded] if snapstore.writes_json() else []
+        if not dirty and not hb:
+            return
+
+        # First sighting of a token with no indicator doc in memory (e.g. backfill
+        # skipped it): merge whatever snap:{sym} already holds, once.
+        if unseeded:
+            pipe = self.r.pipeline(transaction=False)
+            for t in unseeded:
+                pipe.get(snapstore.snap_key(self.token2sym[t]))
+            prevs = pipe.execute()
+            with self._snap_lock:
+                for t, raw in zip(unseeded, prevs):
+                    self._snap_seeded.add(t)
+                    if not raw:
+                        continue
                     try:
-                        snap_prev = json.loads(prev)
-                        for k, v in snap_prev.items():
-                            if k not in snap:
-                                snap[k] = v
+                        prev = json.loads(raw)
                     except Exception:
-                        pass
-                self.r.setex(f"snap:{sym}", 120, json.dumps(snap))
+                        continue
+                    doc = self._snap_cache.setdefault(t, {})
+                    for k, v in prev.items():
+                        doc.setdefault(k, v)
+
+        with self._snap_lock:
+            docs = [(self.token2sym[t], dict(self._snap_cache[t])) for t in dirty if t in self._snap_cache]
+
+        pipe = self.r.pipeline(transaction=False)
+        for sym, doc in docs:
+            if snapstore.writes_json():
+                snapstore.put_json(pipe, sym, doc, SNAP_TTL_S)
+            if snapstore.writes_hash():
+                # indicator fields are written at minute close; ticks only move these
+                snapstore.put_fields(pipe, sym, {"last_price": doc.get("last_price"), "ts_ms": doc.get("ts_ms")}, SNAP_TTL_S)
+            streams.add_tick(pipe, sym, doc.get("last_price"), doc.get("ts_ms"))
+        if hb:
+            self._mark_alive(pipe)
+        q = self._tick_q
+        pipe.hset(f"ticker:ingest:{self.shard_id}", mapping={
+            "depth": len(q), "max": q.maxsize, "high_water": q.high_water, "policy": q.policy,
+            "dropped": q.dropped, "coalesced": q.coalesced, "late_ticks": self._late_ticks, "ts_ms": self.clock(),
+        })
+        if time.monotonic() >= self._next_metrics:
+            self._next_metrics = time.monotonic() + METRICS_PUBLISH_SEC
+            self._publish_metrics(pipe)
+        t0 = time.perf_counter()
+        pipe.execute()
+        self._m_flush_s.observe(time.perf_counter() - t0)
+        if docs:
+            self._m_snaps.inc(len(docs))
+            if since:
+                self._m_lag_s.observe(max(0, self.clock() - since) / 1000.0)
+
+    def _ingest_loop(self):
+        """
+        Drain the tick queue, close minutes on wall-clock boundaries and flush
+        snapshots every SNAP_FLUSH_MS, whether or not ticks are arriving.
+        """
+        interval = max(10, SNAP_FLUSH_MS) / 1000.0
+        next_flush = time.monotonic() + interval
+        while not self._stop.is_set():
+            item = self._tick_q.get(timeout=max(0.0, next_flush - time.monotonic()))
+            if item is not None:
+                self._m_queue_wait_s.observe(max(0, self.clock() - item[0]) / 1000.0)
+                t0 = time.perf_counter()
+                try:
+                    self._process_ticks(*item)
+                except Exception as e:
+                    print(f"[ticker{self._tag}] tick processing failed: {e}", file=sys.stderr)
+                self._m_process_s.observe(time.perf_counter() - t0)
+            self._drain_backfill()
+            self._close_due_minutes(self.clock())
+            if time.monotonic() >= next_flush:
+                try:
+                    self._flush_snaps()
+                    if self._capture is not None:
+                        self._capture.flush()
+                except Exception as e:
+                    print(f"[ticker{self._tag}] snapshot flush failed: {e}", file=sys.stderr)
+                next_flush = time.monotonic() + interval
 
     def _on_connect(self, ws, resp):
         try:
             # Mark ticker as alive immediately on connection
-            now = now_s()
-            self.r.set("ticker:alive", now)
-            self.r.set("ticker:heartbeat", now_ms())
-            
+            self._mark_alive()
+
             self._subscribe_active()
-            print(f"[ticker] connected and subscribed {len(self.subscribed)} tokens", file=sys.stderr)
+            print(f"[ticker{self._tag}] connected and subscribed {len(self.subscribed)} tokens", file=sys.stderr)
         except Exception as e:
             print("subscribe failed:", e, file=sys.stderr)
-            self.r.set("ticker:alive", 0)
+            self._mark_down()
 
     def _on_close(self, ws, code, reason):
-        print(f"[ticker] WebSocket closed: code={code}, reason={reason}", file=sys.stderr)
-        self.r.set("ticker:alive", 0)
+        print(f"[ticker{self._tag}] WebSocket closed: code={code}, reason={reason}", file=sys.stderr)
+        self._mark_down()
 
     def _on_error(self, ws, code, reason):
-        print(f"[ticker] WebSocket error: code={code}, reason={reason}", file=sys.stderr)
-        self.r.set("ticker:alive", 0)
+        print(f"[ticker{self._tag}] WebSocket error: code={code}, reason={reason}", file=sys.stderr)
+        self._mark_down()
 
     def run(self):
-        print(f"[ticker] Starting ticker daemon with {len(self.active_tokens)} active tokens", file=sys.stderr)
+        print(f"[ticker{self._tag}] Starting ticker daemon with {len(self.active_tokens)} active tokens", file=sys.stderr)
         
-        try:
-            print("[ticker] Running backfill...", file=sys.stderr)
-            self.backfill()
-            print("[ticker] Backfill completed", file=sys.stderr)
-        except Exception as e:
-            print(f"[ticker] Backfill failed: {e}", file=sys.stderr)
+        worker = threading.Thread(target=self._ingest_loop, name="tick-ingest", daemon=True)
+        worker.start()
+
+        # Backfill runs alongside the live feed; the socket connects right away.
+        tokens = [t for t in self.active_tokens if t in self.token2sym]
+        self._backfill_pending.update(tokens)
+
+        def run_backfill():
+            try:
+                print(f"[ticker{self._tag}] Running backfill for {len(tokens)} tokens...", file=sys.stderr)
+                self.backfill(tokens)
+                print(f"[ticker{self._tag}] Backfill completed", file=sys.stderr)
+            except Exception as e:
+                print(f"[ticker{self._tag}] Backfill failed: {e}", file=sys.stderr)
+
+        threading.Thread(target=run_backfill, name="backfill", daemon=True).start()
+        if ROTATE_PROBE:
+            threading.Thread(target=self._probe_loop, name="universe-probe", daemon=True).start()
 
         self.kws.on_ticks = self._on_ticks
         self.kws.on_connect = self._on_connect
@@ -541,9 +1751,9 @@ class TickerDaemon:
         self.kws.on_error  = self._on_error
 
         def stop_handler(*_):
-            print("[ticker] Received stop signal", file=sys.stderr)
+            print(f"[ticker{self._tag}] Received stop signal", file=sys.stderr)
             self._stop.set()
-            self.r.set("ticker:alive", 0)
+            self._mark_down()
             try:
                 self.kws.stop()
             except Exception:
@@ -552,24 +1762,72 @@ class TickerDaemon:
         signal.signal(signal.SIGINT,  stop_handler)
         signal.signal(signal.SIGTERM, stop_handler)
 
-        print("[ticker] Connecting to KiteTicker WebSocket...", file=sys.stderr)
+        print(f"[ticker{self._tag}] Connecting to KiteTicker WebSocket...", file=sys.stderr)
         while not self._stop.is_set():
             try:
                 self.kws.connect(threaded=False)
             except (NetworkException, TokenException) as e:
-                print(f"[ticker] WebSocket error, retrying in 2s: {e}", file=sys.stderr)
-                self.r.set("ticker:alive", 0)
+                print(f"[ticker{self._tag}] WebSocket error, retrying in 2s: {e}", file=sys.stderr)
+                self._mark_down()
                 time.sleep(2)
             except Exception as e:
-                print(f"[ticker] Unexpected socket error, retrying in 2s: {e}", file=sys.stderr)
-                self.r.set("ticker:alive", 0)
+                print(f"[ticker{self._tag}] Unexpected socket error, retrying in 2s: {e}", file=sys.stderr)
+                self._mark_down()
                 time.sleep(2)
         
-        print("[ticker] Ticker daemon stopped", file=sys.stderr)
-
+        worker.join(timeout=5)
+        self._hb_pending = False  # stop_handler already marked the ticker down
+        try:
+            self._flush_snaps()
+        except Exception:
+            pass
+        if self._capture is not None:
+            self._capture.close()
+        if CKPT_EVERY_MIN > 0:
+            self._checkpoint(wait=True)
+        print(f"[ticker{self._tag}] Ticker daemon stopped", file=sys.stderr)
+
+
+def _run_shard(shard_id: int, shards: int):
+    TickerDaemon(shard_id=shard_id, shards=shards).run()
+
+def _supervise(shards: int):
+    """Run one process per shard (separate cores and KiteTicker connections); restart crashed ones."""
+    ctx = mp.get_context("spawn")
+    procs: Dict[int, Any] = {}
+    stop = threading.Event()
+
+    def stop_handler(*_):
+        stop.set()
+        for p in procs.values():
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGINT,  stop_handler)
+    signal.signal(signal.SIGTERM, stop_handler)
+
+    print(f"[ticker] Starting {shards} shard processes", file=sys.stderr)
+    while not stop.is_set():
+        for i in range(shards):
+            p = procs.get(i)
+            if p is None or not p.is_alive():
+                if p is not None:
+                    print(f"[ticker] shard {i} exited code={p.exitcode}, restarting", file=sys.stderr)
+                p = ctx.Process(target=_run_shard, args=(i, shards), name=f"ticker-shard-{i}", daemon=False)
+                p.start()
+                procs[i] = p
+        stop.wait(2)
+    for p in procs.values():
+        p.join(timeout=10)
+    print("[ticker] All shards stopped", file=sys.stderr)
 
 def run():
-    TickerDaemon().run()
+    if TICKER_SHARD_ID is not None:
+        TickerDaemon(shard_id=int(TICKER_SHARD_ID), shards=TICKER_SHARDS).run()
+    elif TICKER_SHARDS > 1:
+        _supervise(TICKER_SHARDS)
+    else:
+        TickerDaemon().run()
 
 
 if __name__ == "__main__":
@@ -223,6 +223,9 @@ BSE_HIGH_VOLUME = [
     "BSE:SBIN", "BSE:BHARTIARTL", "BSE:ITC", "BSE:LT", "BSE:KOTAKBANK",
 ]
 
+# Membership set for the curated lists (checked once per symbol per plan)
+CURATED_SYMBOLS = frozenset(NSE_UNIVERSE + BSE_HIGH_VOLUME)
+
 
 def get_intraday_universe(limit: int = 300, exchange: str = "NSE") -> list[str]:
     """
@@ -275,8 +278,7 @@ def is_intraday_tradable(symbol: str, strict: bool = True) -> bool:
     
     # Check 2: If strict mode, must be in curated universe
     if strict:
-        all_symbols = NSE_UNIVERSE + BSE_HIGH_VOLUME
-        return symbol in all_symbols
+        return symbol in CURATED_SYMBOLS
     
     # Check 3: For non-strict (Analyst), allow EQ series only
     # This ensures liquidity even for stocks not in universe
@@ -286,8 +288,7 @@ def is_intraday_tradable(symbol: str, strict: bool = True) -> bool:
     # Check 4: If no suffix, assume it's equity and check if in universe
     # (This handles symbols entered without -EQ suffix)
     if not any(tradingsymbol.endswith(sfx) for sfx in ["-EQ", "-BE", "-BZ", "-BL"]):
-        all_symbols = NSE_UNIVERSE + BSE_HIGH_VOLUME
-        return symbol in all_symbols
+        return symbol in CURATED_SYMBOLS
     
     # Default: not suitable
     return False
@@ -320,8 +321,7 @@ def get_non_intraday_reason(symbol: str) -> str | None:
         return "blacklisted"  # Blacklisted
     
     # Check if in universe (for Top Algos filtering)
-    all_symbols = NSE_UNIVERSE + BSE_HIGH_VOLUME
-    if symbol not in all_symbols:
+    if symbol not in CURATED_SYMBOLS:
         return "low_liquidity"  # Not in curated universe = lower liquidity
     
     return None  # Suitable for intraday